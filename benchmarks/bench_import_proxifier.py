@@ -0,0 +1,114 @@
+"""
+Benchmark of the cost that the import proxifier adds to imports which are NOT aliased,
+i.e nearly all imports of a process, since its finder is first in sys.meta_path.
+
+It compares the current lookup with the legacy one (linear scan of a list of aliases),
+and measures the import of a bunch of stdlib modules in fresh subprocesses, without
+proxifier, and with proxifier installed first or after builtin finders.
+
+Usage: python benchmarks/bench_import_proxifier.py [--aliases 5000]
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from compat_patcher_core import import_proxifier  # noqa
+
+UNRELATED_MODULE_NAMES = [
+    "json",
+    "logging.handlers",
+    "email.mime.text",
+    "xml.etree.ElementTree",
+    "concurrent.futures.thread",
+    "some_third_party.submodule.subsubmodule",
+]
+
+IMPORT_HEAVY_SCRIPT = """
+import sys, time
+sys.path.insert(0, %(src_dir)r)
+from compat_patcher_core import import_proxifier
+for i in range(%(aliases)d):
+    import_proxifier.register_module_alias("legacy_pkg_%%d.sub" %% i, "json")
+if %(mode)r != "none":
+    import_proxifier.install_import_proxifier(
+        after_builtin_finders=(%(mode)r == "after_builtin_finders")
+    )
+start = time.perf_counter()
+import argparse, asyncio, csv, decimal, email.mime.multipart, fractions, http.client
+import json, logging.handlers, pickle, sqlite3, statistics, unittest, urllib.request
+import xml.dom.minidom, zipfile
+print(time.perf_counter() - start)
+"""
+
+
+def _legacy_get_module_alias_real_name(aliases_list, fullname):
+    """Former implementation, kept for comparison."""
+    for k, v in aliases_list:
+        if (k == fullname) or fullname.startswith(k + "."):
+            return fullname.replace(k, v)
+    return None
+
+
+def bench_lookups(aliases_count, number):
+    aliases_list = []
+    for i in range(aliases_count):
+        alias_name = "legacy_pkg_%d.sub" % i
+        aliases_list.append((alias_name, "json"))
+        import_proxifier.register_module_alias(alias_name, "json")
+
+    finder = import_proxifier.ModuleAliasFinder
+
+    def legacy():
+        for name in UNRELATED_MODULE_NAMES:
+            _legacy_get_module_alias_real_name(aliases_list, name)
+
+    def current():
+        for name in UNRELATED_MODULE_NAMES:
+            finder.find_spec(name)
+
+    for label, func in (("legacy linear scan", legacy), ("current finder", current)):
+        duration = min(timeit.repeat(func, number=number, repeat=5))
+        print(
+            "%-20s: %8.3f us per unrelated lookup"
+            % (label, duration * 1e6 / (number * len(UNRELATED_MODULE_NAMES)))
+        )
+
+
+def bench_imports(aliases_count, repeat):
+    for mode in ("none", "first", "after_builtin_finders"):
+        script = IMPORT_HEAVY_SCRIPT % dict(
+            src_dir=SRC_DIR, aliases=aliases_count, mode=mode
+        )
+        durations = [
+            float(subprocess.check_output([sys.executable, "-c", script]))
+            for _ in range(repeat)
+        ]
+        print(
+            "%-36s: %8.2f ms for stdlib imports (best of %d)"
+            % ("proxifier " + mode, min(durations) * 1000, repeat)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--aliases", type=int, default=5000)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("== Lookups of unrelated module names, with %d aliases ==" % args.aliases)
+    bench_lookups(args.aliases, number=args.number)
+    print("== Import-heavy workload in subprocesses ==")
+    bench_imports(args.aliases, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main()
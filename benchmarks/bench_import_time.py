@@ -0,0 +1,132 @@
+"""
+Benchmark of the import time of compat_patcher_core modules, using "python -X importtime".
+
+For each import statement, it runs fresh subprocesses and reports the cumulative import
+time of compat_patcher_core modules (best of N runs), as well as the heavy stdlib
+modules which got imported along. Results can be saved as a baseline, and later runs
+compared to it, the script exiting with an error status in case of regression.
+
+Usage: python benchmarks/bench_import_time.py [--save-baseline FILE | --compare FILE]
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+IMPORT_STATEMENTS = [
+    "import compat_patcher_core",
+    "from compat_patcher_core.utilities import WarningsProxy",
+    "from compat_patcher_core.registry import PatchingRegistry",
+    "from compat_patcher_core import generic_patch_software, PatchingRegistry, "
+    "PatchingRunner, PatchingUtilities",
+]
+
+#: Stdlib modules which should only be imported when really needed
+HEAVY_MODULES = ["logging", "importlib", "json", "hashlib", "csv", "concurrent"]
+
+
+def _parse_importtime_output(output):
+    """Return the cumulative import time (in us) of toplevel imports of our package,
+    and the set of all modules imported."""
+    package_time = 0
+    imported_modules = set()
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        stripped_name = name.strip()
+        imported_modules.add(stripped_name)
+        is_toplevel = len(name) - len(name.lstrip()) == 1
+        if is_toplevel and stripped_name.startswith("compat_patcher_core"):
+            package_time += int(cumulative)
+    return package_time, imported_modules
+
+
+def measure_import(statement, repeat):
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    best_time = None
+    imported_modules = set()
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            env=env,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        package_time, imported_modules = _parse_importtime_output(process.stderr)
+        best_time = package_time if best_time is None else min(best_time, package_time)
+    heavy_modules = sorted(
+        m for m in HEAVY_MODULES if m in imported_modules
+    )  # Only toplevel names are checked
+    return dict(import_time_us=best_time, heavy_modules=heavy_modules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--compare", metavar="FILE")
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=1.5,
+        help="Allowed ratio between measured and baseline import times",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for statement in IMPORT_STATEMENTS:
+        results[statement] = measure_import(statement, repeat=args.repeat)
+        print(
+            "%8.2f ms  %-60s heavy modules: %s"
+            % (
+                results[statement]["import_time_us"] / 1000,
+                statement[:60],
+                ", ".join(results[statement]["heavy_modules"]) or "-",
+            )
+        )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("Baseline saved to %s" % args.save_baseline)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = []
+        for statement, result in sorted(results.items()):
+            if statement not in baseline:
+                continue
+            reference = baseline[statement]
+            if result["import_time_us"] > args.max_slowdown * max(
+                reference["import_time_us"], 1
+            ):
+                regressions.append(
+                    "%s: %dus instead of %dus"
+                    % (statement, result["import_time_us"], reference["import_time_us"])
+                )
+            new_heavy_modules = set(result["heavy_modules"]) - set(
+                reference["heavy_modules"]
+            )
+            if new_heavy_modules:
+                regressions.append(
+                    "%s: now imports %s" % (statement, ", ".join(sorted(new_heavy_modules)))
+                )
+        if regressions:
+            print("IMPORT TIME REGRESSIONS:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("No import time regression compared to %s" % args.compare)
+
+
+if __name__ == "__main__":
+    main()
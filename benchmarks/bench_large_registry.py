@@ -0,0 +1,239 @@
+"""
+Benchmark suite of compat_patcher_core on large synthetic registries and import aliases.
+
+For each registry size, it measures the build (time and memory peak) of the registry,
+the selection and sorting of relevant fixers, their application, the generation
+of the RST table of fixers, and the patch plan cache (misses versus hits, for a
+registry not populated yet, like at process startup); then the lookup overhead of
+the import proxifier, with thousands of aliases.
+
+Results can be saved as a baseline, and later runs compared to it, the script
+exiting with an error status in case of regression.
+
+Usage: python benchmarks/bench_large_registry.py [--sizes 1000,10000,100000]
+           [--save-baseline FILE | --compare FILE]
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+from synthetic_registry import (
+    TARGET_MODULE_NAME,
+    make_synthetic_module_aliases,
+    make_synthetic_registry,
+)
+
+from compat_patcher_core import DEFAULT_SETTINGS, import_proxifier  # noqa
+from compat_patcher_core.readme_generator import _make_rst_table
+from compat_patcher_core.runner import PatchingRunner
+from compat_patcher_core.utilities import PatchingUtilities
+
+SETTINGS = dict(DEFAULT_SETTINGS, logging_level=None)
+
+UNRELATED_MODULE_NAMES = ["json", "logging.handlers", "xml.etree.ElementTree"]
+
+
+def _best_duration(func, repeat, number=1):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def bench_registry(fixers_count, repeat):
+    tracemalloc.start()
+    start = time.perf_counter()
+    registry = make_synthetic_registry(fixers_count)
+    build_duration = time.perf_counter() - start
+    build_peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    patching_utilities = PatchingUtilities(settings=SETTINGS)
+    patching_runner = PatchingRunner(
+        settings=SETTINGS,
+        patching_registry=registry,
+        patching_utilities=patching_utilities,
+    )
+    selected_fixers_count = len(patching_runner._get_sorted_relevant_fixers())
+    selection_duration = _best_duration(
+        patching_runner._get_sorted_relevant_fixers, repeat=repeat
+    )
+
+    target_module = sys.modules[TARGET_MODULE_NAME]
+
+    def _patch_software():
+        PatchingRunner._clear_all_applied_fixers()
+        for name in [name for name in vars(target_module) if name.startswith("fix_")]:
+            delattr(target_module, name)  # Attributes injected by a previous run
+        patching_runner.patch_software()
+
+    patching_duration = _best_duration(_patch_software, repeat=max(1, repeat // 5))
+    PatchingRunner._clear_all_applied_fixers()
+    patching_utilities.injected_objects_registry.clear()
+
+    table_duration = _best_duration(
+        lambda: _make_rst_table(registry), repeat=max(1, repeat // 5)
+    )
+
+    return {
+        "build_ms": build_duration * 1000,
+        "build_peak_memory_kb": build_peak_memory / 1024,
+        "selection_ms": selection_duration * 1000,
+        "selected_fixers": selected_fixers_count,
+        "patching_ms": patching_duration * 1000,
+        "readme_table_ms": table_duration * 1000,
+    }
+
+
+def bench_patch_plan_cache(fixers_count, repeat):
+    cache_dir = tempfile.mkdtemp(prefix="bench_patch_plans_")
+
+    def _get_patch_plan_duration(patch_plan_key, clear_cache):
+        if clear_cache:
+            for filename in os.listdir(cache_dir):
+                os.remove(os.path.join(cache_dir, filename))
+        patching_runner = PatchingRunner(
+            settings=SETTINGS,
+            patching_registry=make_synthetic_registry(fixers_count, lazy=True),
+            patching_utilities=PatchingUtilities(settings=SETTINGS),
+            patch_plan_cache_dir=cache_dir,
+            patch_plan_key=patch_plan_key,
+        )
+        start = time.perf_counter()
+        patching_runner._get_patch_plan()
+        return time.perf_counter() - start
+
+    def _best_plan_duration(patch_plan_key, clear_cache):
+        return min(
+            _get_patch_plan_duration(patch_plan_key, clear_cache=clear_cache)
+            for _ in range(repeat)
+        )
+
+    try:
+        miss_duration = _best_plan_duration("1.0", clear_cache=True)
+        _get_patch_plan_duration("1.0", clear_cache=False)  # Primes the cache
+        hit_duration = _best_plan_duration("1.0", clear_cache=False)
+        _get_patch_plan_duration(None, clear_cache=False)
+        fingerprint_hit_duration = _best_plan_duration(None, clear_cache=False)
+    finally:
+        shutil.rmtree(cache_dir)
+
+    return {
+        "plan_miss_ms": miss_duration * 1000,
+        "plan_hit_ms": hit_duration * 1000,
+        "plan_hit_without_key_ms": fingerprint_hit_duration * 1000,
+        "plan_hit_speedup": miss_duration / hit_duration,
+        "plan_hit_without_key_speedup": miss_duration / fingerprint_hit_duration,
+    }
+
+
+def bench_import_aliases(aliases_count, number):
+    aliases = make_synthetic_module_aliases(aliases_count)
+    import_proxifier.register_module_aliases(aliases)
+    aliased_names = sorted(aliases)[:: max(1, aliases_count // 100)]
+    finder = import_proxifier.ModuleAliasFinder
+
+    def _lookup_unrelated():
+        for name in UNRELATED_MODULE_NAMES:
+            finder.find_spec(name)
+
+    def _lookup_aliased():
+        for name in aliased_names:
+            finder.find_spec(name)
+
+    try:
+        unrelated_duration = min(
+            timeit.repeat(_lookup_unrelated, number=number, repeat=5)
+        ) / (number * len(UNRELATED_MODULE_NAMES))
+        aliased_duration = min(
+            timeit.repeat(_lookup_aliased, number=max(1, number // 10), repeat=5)
+        ) / (max(1, number // 10) * len(aliased_names))
+    finally:
+        import_proxifier.unregister_module_aliases(list(aliases))
+
+    return {
+        "unrelated_lookup_us": unrelated_duration * 1e6,
+        "aliased_lookup_us": aliased_duration * 1e6,
+    }
+
+
+#: Metrics which are not durations/sizes, and thus not checked for regressions
+_INFORMATIVE_METRICS = (
+    "selected_fixers",
+    "plan_hit_speedup",
+    "plan_hit_without_key_speedup",
+)
+
+
+def compare_to_baseline(results, baseline, max_slowdown):
+    """Return the list of regressions (as strings) of results, compared to baseline."""
+    regressions = []
+    for section, metrics in sorted(results.items()):
+        for name, value in sorted(metrics.items()):
+            reference = baseline.get(section, {}).get(name)
+            if reference is None or name in _INFORMATIVE_METRICS:
+                continue
+            if value > max_slowdown * reference:
+                regressions.append(
+                    "%s/%s: %.3f instead of %.3f" % (section, name, value, reference)
+                )
+    return regressions
+
+
+def _format_metrics(metrics):
+    return "  ".join(
+        "%s=%s" % (name, round(value, 3)) for (name, value) in sorted(metrics.items())
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000")
+    parser.add_argument("--aliases", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--compare", metavar="FILE")
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=1.5,
+        help="Allowed ratio between measured and baseline values",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for fixers_count in [int(size) for size in args.sizes.split(",")]:
+        section = "registry_%d" % fixers_count
+        results[section] = bench_registry(fixers_count, repeat=args.repeat)
+        results[section].update(
+            bench_patch_plan_cache(fixers_count, repeat=max(1, args.repeat // 5))
+        )
+        print("%-16s %s" % (section, _format_metrics(results[section])))
+
+    section = "aliases_%d" % args.aliases
+    results[section] = bench_import_aliases(args.aliases, number=2000)
+    print("%-16s %s" % (section, _format_metrics(results[section])))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("Baseline saved to %s" % args.save_baseline)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.max_slowdown)
+        if regressions:
+            print("PERFORMANCE REGRESSIONS:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("No performance regression compared to %s" % args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Generators of synthetic patching registries and import aliases, of arbitrary sizes,
+for benchmarks.
+
+Fixers are spread over many families (i.e reference versions), and like real-life
+fixers most of them only apply from their reference version on, some only up to a
+later version, and a few have tags.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import functools
+import os
+import random
+import sys
+import types
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from compat_patcher_core import PatchingRegistry  # noqa
+
+#: Module in which synthetic fixers inject their attributes
+TARGET_MODULE_NAME = "_synthetic_patched_module"
+
+#: Module exposing synthetic fixers, so that they can be imported like real ones
+FIXERS_MODULE_NAME = "_synthetic_fixers_module"
+
+SOFTWARE_VERSIONS = [
+    (major, minor) for major in range(1, 6) for minor in range(0, 12)
+]  # From 1.0 to 5.11
+FIXER_TAGS = ["startup", "late", "orm", "templates"]
+
+
+def _get_module(module_name):
+    module = sys.modules.get(module_name)
+    if module is None:
+        module = sys.modules[module_name] = types.ModuleType(module_name)
+    return module
+
+
+def _make_fixer_callable(fixer_id):
+    target_module = _get_module(TARGET_MODULE_NAME)
+
+    def fixer(utils):
+        utils.inject_attribute(target_module, fixer_id, fixer_id)
+
+    fixer.__name__ = fixer_id
+    fixer.__doc__ = "Synthetic fixer %s, injecting an attribute" % fixer_id
+    fixer.__module__ = FIXERS_MODULE_NAME
+    setattr(_get_module(FIXERS_MODULE_NAME), fixer_id, fixer)
+    return fixer
+
+
+def _format_version(version):
+    return ".".join(str(number) for number in version)
+
+
+def make_synthetic_registry(
+    fixers_count,
+    current_software_version="3.6",
+    family_prefix="synthetic",
+    seed=0,
+    lazy=False,
+):
+    """Return a PatchingRegistry populated with `fixers_count` synthetic fixers.
+
+    If `lazy` is True, fixers are only registered when the registry gets populated,
+    like fixers of real registries which are in submodules.
+    """
+    populate_callable = None
+    if lazy:
+        populate_callable = functools.partial(
+            _register_synthetic_fixers, fixers_count, seed
+        )
+    registry = PatchingRegistry(
+        family_prefix=family_prefix,
+        populate_callable=populate_callable,
+        current_software_version=current_software_version,
+    )
+    if not lazy:
+        _register_synthetic_fixers(fixers_count, seed, registry)
+    return registry
+
+
+def _register_synthetic_fixers(fixers_count, seed, registry):
+    rng = random.Random(seed)
+    for index in range(fixers_count):
+        version_index = rng.randrange(len(SOFTWARE_VERSIONS))
+        reference_version = _format_version(SOFTWARE_VERSIONS[version_index])
+
+        applied_from_version = None
+        if rng.random() < 0.7:  # Backwards-compatibility fixer
+            applied_from_version = reference_version
+
+        applied_upto_version = None
+        if rng.random() < 0.3 and version_index + 1 < len(SOFTWARE_VERSIONS):
+            applied_upto_version = _format_version(
+                SOFTWARE_VERSIONS[rng.randrange(version_index + 1, len(SOFTWARE_VERSIONS))]
+            )
+
+        fixer_tags = None
+        if rng.random() < 0.2:
+            fixer_tags = [rng.choice(FIXER_TAGS)]
+
+        registry.register_compatibility_fixer(
+            fixer_reference_version=reference_version,
+            fixer_applied_from_version=applied_from_version,
+            fixer_applied_upto_version=applied_upto_version,
+            fixer_tags=fixer_tags,
+        )(_make_fixer_callable("fix_synthetic_%06d" % index))
+
+
+def make_synthetic_module_aliases(aliases_count, real_name="json", seed=0):
+    """Return a dict of `aliases_count` nested alias module names, all pointing to
+    `real_name`, spread over a few top-level legacy packages."""
+    rng = random.Random(seed)
+    aliases = {}
+    for index in range(aliases_count):
+        alias_name = "legacy_pkg_%d.sub_%d.mod_%d" % (
+            rng.randrange(20),
+            rng.randrange(50),
+            index,
+        )
+        aliases[alias_name] = real_name
+    return aliases
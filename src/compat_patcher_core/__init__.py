@@ -1,44 +1,122 @@
-import threading as _threading
-
-from .exceptions import SkipFixerException
-from .registry import PatchingRegistry, MultiPatchingRegistry
-from .runner import PatchingRunner
-from .utilities import (
-    PatchingUtilities,
-    WarningsProxy,
-    tuplify_software_version,
-    detuplify_software_version,
+from .locking import PATCHING_LOCK, set_lock_wait_reporter
+
+#: Public names lazily loaded from submodules (PEP 562), to keep the import
+#: of this package cheap for processes which only need a part of it
+_LAZY_ATTRIBUTES = {
+    "SkipFixerException": "exceptions",
+    "PatchingRegistry": "registry",
+    "MultiPatchingRegistry": "registry",
+    "PatchingRunner": "runner",
+    "PatchingUtilities": "utilities",
+    "WarningsProxy": "utilities",
+    "tuplify_software_version": "utilities",
+    "detuplify_software_version": "utilities",
+}
+
+#: Submodules which used to be eagerly imported, and thus available as attributes
+_LAZY_SUBMODULES = ("exceptions", "registry", "runner", "utilities")
+
+__all__ = sorted(
+    list(_LAZY_ATTRIBUTES)
+    + [
+        "PATCHING_LOCK",
+        "set_lock_wait_reporter",
+        "generic_patch_software",
+        "DEFAULT_SETTINGS",
+        "make_safe_patcher",
+    ]
 )
 
 
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        # Builtin __import__() avoids loading importlib, and sets the attribute
+        __import__(__name__ + "." + name)
+        return globals()[name]
+    submodule_name = _LAZY_ATTRIBUTES.get(name)
+    if submodule_name is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    # With a fromlist, builtin __import__() returns the submodule itself
+    submodule = __import__(__name__ + "." + submodule_name, fromlist=[name])
+    value = getattr(submodule, name)
+    globals()[name] = value  # Next accesses won't go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_LAZY_SUBMODULES))
+
+
 def generic_patch_software(
     settings,
     patching_registry,
-    patching_utilities_class=PatchingUtilities,
-    patching_runner_class=PatchingRunner,
+    patching_utilities_class=None,
+    patching_runner_class=None,
     warnings_proxy=None,
+    patch_plan_cache_dir=None,
+    freeze_registry=False,
+    tracer=None,
+    patch_plan_key=None,
 ):
     """Load all dependencies, and apply relevant fixers from the `patching_registry`,
     according to the settings of the provided `settings`.
 
     You can provide custom classes to be instantiated instead of default ones, and/or an
     existing WarningsProxy which will be updated with the new settings as soon as possible.
-    """
 
-    patching_registry.populate()
-    assert patching_registry._is_populated
+    If `patch_plan_cache_dir` is provided, the list of fixers to apply is cached in this
+    directory, and reused by next processes having the same fixers and settings.
+    Providing a `patch_plan_key` too (a string changing whenever fixers change, e.g.
+    the version of the compat package) makes cache hits cheaper, since the registry
+    then doesn't need to be populated, see `PatchingRunner`.
 
-    patching_utilities = patching_utilities_class(settings=settings)
+    If `freeze_registry` is True, the registry is frozen once populated, so that later
+    queries on it from any thread don't need locking.
 
-    if warnings_proxy:  # Update the config of preexisting WarningsProxy
-        warnings_proxy.set_patching_utilities(patching_utilities)
+    `tracer` may be a tracer like `compat_patcher_core.tracing.ChromeTraceTracer`,
+    receiving nested spans for populate, fixers selection and application.
 
-    patching_runner = patching_runner_class(
-        settings=settings,
-        patching_utilities=patching_utilities,
-        patching_registry=patching_registry,
-    )
-    patching_runner.patch_software()
+    `patching_utilities_class` and `patching_runner_class` default to PatchingUtilities
+    and PatchingRunner.
+    """
+    if patching_utilities_class is None:
+        from .utilities import PatchingUtilities as patching_utilities_class
+    if patching_runner_class is None:
+        from .runner import PatchingRunner as patching_runner_class
+    if tracer is None:
+        from .tracing import NULL_TRACER as tracer
+
+    with tracer.span("generic_patch_software"):
+
+        # With a cheap patch plan key, populating is only needed on cache misses
+        lazy_populate = bool(patch_plan_cache_dir and patch_plan_key is not None)
+        if freeze_registry or not lazy_populate:
+            with tracer.span("populate"):
+                patching_registry.populate()
+            assert patching_registry._is_populated
+        if freeze_registry:
+            patching_registry.freeze()
+
+        patching_utilities = patching_utilities_class(settings=settings)
+
+        if warnings_proxy:  # Update the config of preexisting WarningsProxy
+            warnings_proxy.set_patching_utilities(patching_utilities)
+
+        runner_kwargs = {}
+        if patch_plan_cache_dir:  # Custom runner classes might not support these
+            runner_kwargs["patch_plan_cache_dir"] = patch_plan_cache_dir
+        if patch_plan_key is not None:
+            runner_kwargs["patch_plan_key"] = patch_plan_key
+        if tracer.enabled:
+            runner_kwargs["tracer"] = tracer
+
+        patching_runner = patching_runner_class(
+            settings=settings,
+            patching_utilities=patching_utilities,
+            patching_registry=patching_registry,
+            **runner_kwargs
+        )
+        patching_runner.patch_software()
 
     return None  # No return value for now, if some is set one day it shall be a DICT!
 
@@ -55,23 +133,37 @@ DEFAULT_SETTINGS = dict(
 )
 
 
-#: Lock meant to globally protect all the patching workflow
-PATCHING_LOCK = _threading.RLock()
-
-
-def make_safe_patcher(f):
+def make_safe_patcher(f=None, lock_keys=None):
     """
     This decorator makes a patching launcher thread-safe with a recursive lock.
 
+    By default, the global PATCHING_LOCK is used, so all such patchers exclude each
+    other. To let independent patchers run concurrently, provide `lock_keys`, a
+    patched-software name or a patching registry (or a list of these), e.g.
+    `@make_safe_patcher(lock_keys="django")`. Locks are always acquired in the same
+    order; a patcher calling other patchers must also declare their lock keys (i.e.
+    `compat_patcher_core.locking.GLOBAL_LOCK_KEY` for patchers without lock keys).
+
     Other checks and misc. features might be added in the future, so packages using
     this patching framework should always decorate their main "patch()" entrypoint
     with this utility.
     """
     import functools
 
+    from .locking import acquire_patching_locks, GLOBAL_LOCK_KEY
+
+    if f is None:
+        return functools.partial(make_safe_patcher, lock_keys=lock_keys)
+
+    if lock_keys is None:
+        lock_keys = [GLOBAL_LOCK_KEY]
+    elif not isinstance(lock_keys, (list, tuple)):
+        lock_keys = [lock_keys]
+    assert lock_keys, lock_keys
+
     @functools.wraps(f)
     def inner(*args, **kwargs):
-        with PATCHING_LOCK:
+        with acquire_patching_locks(lock_keys):
             return f(*args, **kwargs)
 
     return inner
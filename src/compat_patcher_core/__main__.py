@@ -0,0 +1,3 @@
+from compat_patcher_core.cli import main
+
+main()
@@ -0,0 +1,316 @@
+"""
+Command-line tools to inspect, profile and benchmark a compat patcher.
+
+Usage: python -m compat_patcher_core {plan,profile,bench} REGISTRY [options]
+
+REGISTRY is the dotted path to a PatchingRegistry, a MultiPatchingRegistry, or a
+callable returning one of them (e.g. "my_compat_patcher.registry.patching_registry").
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+from compat_patcher_core import DEFAULT_SETTINGS, generic_patch_software
+from compat_patcher_core.registry import PatchingRegistry, MultiPatchingRegistry
+from compat_patcher_core.runner import PatchingRunner
+from compat_patcher_core.tracing import ChromeTraceTracer, _ChromeTraceSpan
+from compat_patcher_core.utilities import _import_attribute_from_dotted_string
+
+_PROFILE_RESULT_PREFIX = "PROFILE_RESULT:"
+
+_FILTER_SETTINGS = (
+    "include_fixer_ids",
+    "include_fixer_families",
+    "exclude_fixer_ids",
+    "exclude_fixer_families",
+)
+
+
+def _load_registry(registry_path):
+    registry = _import_attribute_from_dotted_string(registry_path)
+    if not isinstance(registry, (PatchingRegistry, MultiPatchingRegistry)) and callable(
+        registry
+    ):
+        registry = registry()
+    if not isinstance(registry, (PatchingRegistry, MultiPatchingRegistry)):
+        raise ValueError("Wrong registry reference %r" % registry_path)
+    return registry
+
+
+@contextlib.contextmanager
+def _overridden_software_version(registry, software_version):
+    """Temporarily make the registry (or all registries of a MultiPatchingRegistry)
+    use this current software version, if not None, e.g. to apply fixers with
+    generic_patch_software()."""
+    if not software_version:
+        yield
+        return
+    if isinstance(registry, MultiPatchingRegistry):
+        registries = registry._registries
+    else:
+        registries = [registry]
+    previous_versions = [r._current_software_version for r in registries]
+    for r in registries:
+        r._current_software_version = software_version
+    try:
+        yield
+    finally:
+        for r, previous_version in zip(registries, previous_versions):
+            r._current_software_version = previous_version
+
+
+def _parse_filter_value(value):
+    if value in ("*", ""):
+        return value or None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _get_settings(args):
+    """Return patcher settings, built from defaults (with logging disabled) or from
+    the provided --settings dotted path, and overridden by filter options."""
+    if args.settings:
+        settings = dict(_import_attribute_from_dotted_string(args.settings))
+    else:
+        settings = dict(DEFAULT_SETTINGS, logging_level=None)
+    for name in _FILTER_SETTINGS:
+        value = getattr(args, name)
+        if value is not None:
+            settings[name] = _parse_filter_value(value)
+    return settings
+
+
+def _get_selection_kwargs(args, settings):
+    kwargs = {name: settings[name] for name in _FILTER_SETTINGS}
+    if args.software_version:
+        kwargs["current_software_version"] = args.software_version
+    return kwargs
+
+
+def _get_percentiles(durations):
+    """Return a dict of nearest-rank percentiles (in milliseconds) of these durations."""
+    durations = sorted(durations)
+    percentiles = {}
+    for percentile in (50, 90, 99):
+        index = max(0, -(-len(durations) * percentile // 100) - 1)  # Ceil division
+        percentiles["p%d" % percentile] = durations[index] * 1000
+    percentiles["min"] = durations[0] * 1000
+    percentiles["max"] = durations[-1] * 1000
+    return percentiles
+
+
+def command_plan(args):
+    """Print the fixers which would be applied, in order, and why others are skipped."""
+    registry = _load_registry(args.registry)
+    settings = _get_settings(args)
+
+    skip_reasons = []
+
+    def _log(message):
+        fixer_id, _, reason = message[len("Skipping fixer ") :].partition(", ")
+        skip_reasons.append((fixer_id, reason))
+
+    relevant_fixers = registry.get_relevant_fixers(
+        log=_log, **_get_selection_kwargs(args, settings)
+    )
+    PatchingRunner._sort_relevant_fixers(relevant_fixers)
+
+    if args.json:
+        print(
+            json.dumps(
+                dict(
+                    selected=[f["fixer_qualified_name"] for f in relevant_fixers],
+                    skipped=[dict(fixer_id=i, reason=r) for (i, r) in skip_reasons],
+                ),
+                indent=2,
+            )
+        )
+        return
+
+    print("Selected fixers, in order of application (%d):" % len(relevant_fixers))
+    for fixer in relevant_fixers:
+        print("  %s" % fixer["fixer_qualified_name"])
+    print("Skipped fixers (%d):" % len(skip_reasons))
+    for fixer_id, reason in skip_reasons:
+        print("  %s: %s" % (fixer_id, reason))
+
+
+class _ProfilingSpan(_ChromeTraceSpan):
+    """Span also recording the count of modules imported during its execution."""
+
+    def __enter__(self):
+        self._modules_count = len(sys.modules)
+        return super(_ProfilingSpan, self).__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.set_attribute("imported_modules", len(sys.modules) - self._modules_count)
+        return super(_ProfilingSpan, self).__exit__(exc_type, exc_value, traceback)
+
+
+class _ProfilingTracer(ChromeTraceTracer):
+    def span(self, name, **attributes):
+        return _ProfilingSpan(self, name, attributes)
+
+
+def command_profile_worker(args):
+    """Apply fixers in the current process, and print profiling events as JSON."""
+    modules_count = len(sys.modules)
+    start = time.perf_counter()
+    registry = _load_registry(args.registry)
+    registry_import_duration = time.perf_counter() - start
+    registry_imported_modules = len(sys.modules) - modules_count
+
+    settings = _get_settings(args)
+    tracer = _ProfilingTracer()
+    with _overridden_software_version(registry, args.software_version):
+        generic_patch_software(
+            settings=settings, patching_registry=registry, tracer=tracer
+        )
+
+    result = dict(
+        registry_import_ms=registry_import_duration * 1000,
+        registry_imported_modules=registry_imported_modules,
+        events=tracer.get_events(),
+    )
+    print(_PROFILE_RESULT_PREFIX + json.dumps(result, default=repr))
+
+
+def command_profile(args):
+    """Apply fixers in a fresh subprocess, and print per-fixer durations and imports."""
+    worker_args = [sys.executable, "-m", "compat_patcher_core", "_profile_worker"]
+    worker_args += _get_forwarded_args(args)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    output = subprocess.check_output(worker_args, env=env, universal_newlines=True)
+    result_line = [
+        line for line in output.splitlines() if line.startswith(_PROFILE_RESULT_PREFIX)
+    ][-1]
+    result = json.loads(result_line[len(_PROFILE_RESULT_PREFIX) :])
+
+    print(
+        "Registry import: %.2f ms, %d modules"
+        % (result["registry_import_ms"], result["registry_imported_modules"])
+    )
+    for event in result["events"]:
+        print(
+            "%10.3f ms  %4d modules  %-16s %s"
+            % (
+                event["dur"] / 1000,
+                event["args"].get("imported_modules", 0),
+                event["args"].get("status", ""),
+                event["name"],
+            )
+        )
+
+
+def command_bench(args):
+    """Repeat selection and patching, and print percentiles of their durations."""
+    registry = _load_registry(args.registry)
+    settings = _get_settings(args)
+    selection_kwargs = _get_selection_kwargs(args, settings)
+    registry.populate()
+
+    selection_durations = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        relevant_fixers = registry.get_relevant_fixers(**selection_kwargs)
+        PatchingRunner._sort_relevant_fixers(relevant_fixers)
+        selection_durations.append(time.perf_counter() - start)
+
+    patching_durations = []
+    if not args.selection_only:
+        with _overridden_software_version(registry, args.software_version):
+            for _ in range(args.repeat):
+                PatchingRunner._clear_all_applied_fixers()  # Fixers must be idempotent
+                start = time.perf_counter()
+                generic_patch_software(settings=settings, patching_registry=registry)
+                patching_durations.append(time.perf_counter() - start)
+
+    for label, durations in (
+        ("selection", selection_durations),
+        ("patching", patching_durations),
+    ):
+        if not durations:
+            continue
+        percentiles = _get_percentiles(durations)
+        print(
+            "%-10s (%d runs): "
+            % (label, len(durations))
+            + "  ".join(
+                "%s=%.3fms" % (key, percentiles[key])
+                for key in ("min", "p50", "p90", "p99", "max")
+            )
+        )
+
+
+def _get_forwarded_args(args):
+    forwarded_args = [args.registry]
+    if args.software_version:
+        forwarded_args += ["--software-version", args.software_version]
+    if args.settings:
+        forwarded_args += ["--settings", args.settings]
+    for name in _FILTER_SETTINGS:
+        value = getattr(args, name)
+        if value is not None:
+            forwarded_args += ["--" + name.replace("_", "-"), value]
+    return forwarded_args
+
+
+def _add_common_arguments(parser):
+    parser.add_argument("registry", help="Dotted path to the patching registry")
+    parser.add_argument(
+        "--software-version",
+        help="Current software version to use instead of the registry's one",
+    )
+    parser.add_argument(
+        "--settings", help="Dotted path to a dict of patcher settings"
+    )
+    for name in _FILTER_SETTINGS:
+        parser.add_argument(
+            "--" + name.replace("_", "-"),
+            dest=name,
+            help='Comma-separated list, or "*" (overrides settings)',
+        )
+
+
+def get_argument_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m compat_patcher_core", description=__doc__.strip().splitlines()[0]
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    plan_parser = subparsers.add_parser("plan", help=command_plan.__doc__)
+    _add_common_arguments(plan_parser)
+    plan_parser.add_argument("--json", action="store_true", help="Output JSON")
+    plan_parser.set_defaults(handler=command_plan)
+
+    profile_parser = subparsers.add_parser("profile", help=command_profile.__doc__)
+    _add_common_arguments(profile_parser)
+    profile_parser.set_defaults(handler=command_profile)
+
+    worker_parser = subparsers.add_parser("_profile_worker")
+    _add_common_arguments(worker_parser)
+    worker_parser.set_defaults(handler=command_profile_worker)
+
+    bench_parser = subparsers.add_parser("bench", help=command_bench.__doc__)
+    _add_common_arguments(bench_parser)
+    bench_parser.add_argument("--repeat", type=int, default=100)
+    bench_parser.add_argument(
+        "--selection-only",
+        action="store_true",
+        help="Don't apply fixers, only benchmark their selection",
+    )
+    bench_parser.set_defaults(handler=command_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = get_argument_parser().parse_args(argv)
+    args.handler(args)
@@ -18,6 +18,11 @@ There are different ways of implementing "import aliases":
   SINGLETONS whatever their
   possible aliases.
 
+Aliases may also be registered as "lazy": then, if the real module isn't imported
+yet, importing the alias only creates the (empty) real module object, registered under
+both names, and its code is only executed on the first access to one of its missing
+attributes (similarly to importlib.util.LazyLoader).
+
 Beware about not creating loops with your aliases, as this could trigger infinite
 recursions.
 """
@@ -25,9 +30,42 @@ recursions.
 import contextlib
 import importlib
 import sys
+import threading
+import time
+import types
 
 # Maps ALIASES to REAL MODULES
-MODULES_ALIASES_REGISTRY = []
+MODULES_ALIASES_REGISTRY = {}
+
+# Names of ALIASES which must be loaded lazily
+LAZY_MODULES_ALIASES = set()
+
+# Maps OLD MODULE NAMES to dicts mapping OLD SYMBOL NAMES to (NEW MODULE NAME, NEW
+# SYMBOL NAME) pairs, for symbols which moved to other modules
+MOVED_SYMBOLS_REGISTRY = {}
+
+# Index of the same aliases, as a trie of their dotted segments, so that prefix
+# lookups only depend on the depth of module paths; the (real module name, is lazy)
+# pair is stored under the special _TRIE_VALUE key of the node of the last segment
+# of each alias.
+_MODULES_ALIASES_TRIE = {}
+_TRIE_VALUE = None
+
+# Top-level package names of all aliases, so that finders can discard unrelated
+# imports with a single set lookup
+_ALIASED_TOP_LEVEL_NAMES = frozenset()
+
+# Maps module names to the ModuleSpec of their alias (or None if they're not
+# aliases), so that repeated lookups don't rebuild loaders and specs; it must be
+# cleared each time aliases change
+_ALIAS_SPECS_CACHE = {}
+_NOT_CACHED = object()  # Sentinel for cache lookups
+
+# Usage statistics of aliases, only updated when aliased modules are looked up
+_ALIAS_HITS = {}
+_ALIAS_HITS_LOCK = threading.Lock()
+_alias_hits_reporter = None  # Object with an emit_warning() method
+_FIRST_HIT_STACK_LIMIT = 20
 
 
 @contextlib.contextmanager
@@ -47,27 +85,341 @@ def enrich_import_error(alias_name):
         raise
 
 
-def register_module_alias(alias_name, real_name):
+def register_module_alias(alias_name, real_name, lazy=False):
+    """
+    Register an alias for a real module (and thus its submodules too).
+
+    If `lazy` is True, the loading of the real module (and its submodules) is
+    deferred until one of its attributes is accessed.
+
+    Returns True if the alias was registered, False if this alias was already known
+    (in which case the first registration remains in effect).
+    """
+    global _ALIASED_TOP_LEVEL_NAMES
+    registered = _add_module_alias(alias_name, real_name, lazy=lazy)
+    if registered:
+        top_level_name = alias_name.partition(".")[0]
+        if top_level_name not in _ALIASED_TOP_LEVEL_NAMES:
+            _ALIASED_TOP_LEVEL_NAMES = _ALIASED_TOP_LEVEL_NAMES | {top_level_name}
+        _ALIAS_SPECS_CACHE.clear()
+    return registered
+
+
+def register_module_aliases(aliases, lazy=False):
+    """
+    Register a batch of aliases, provided as a dict mapping alias names to real names,
+    in a single step.
+
+    Unlike `register_module_alias()`, the whole batch is first checked against
+    alias loops (taking already registered aliases into account), and ValueError
+    is raised, without registering anything, if one is found.
+
+    Returns the list of alias names which were actually registered (i.e. not
+    already known).
+    """
+    _check_module_aliases_loops(aliases)
+    registered_alias_names = [
+        alias_name
+        for alias_name, real_name in aliases.items()
+        if _add_module_alias(alias_name, real_name, lazy=lazy)
+    ]
+    if registered_alias_names:
+        _refresh_aliased_top_level_names()
+        _ALIAS_SPECS_CACHE.clear()
+    return registered_alias_names
+
+
+def unregister_module_alias(alias_name, purge_modules=False):
+    """
+    Unregister an alias, which must not be used in new imports anymore.
+
+    If `purge_modules` is True, the alias module and its submodules are also removed
+    from sys.modules (and from their parent module, if they were set as attributes
+    there), so that they can't be imported anymore.
+
+    Returns True if the alias was known, else False.
+    """
+    return bool(unregister_module_aliases([alias_name], purge_modules=purge_modules))
+
+
+def unregister_module_aliases(alias_names, purge_modules=False):
+    """
+    Unregister a batch of aliases, in a single step (see `unregister_module_alias()`).
+
+    Returns the list of alias names which were actually unregistered.
+    """
+    unregistered_alias_names = [
+        alias_name for alias_name in alias_names if _remove_module_alias(alias_name)
+    ]
+    if unregistered_alias_names:
+        _refresh_aliased_top_level_names()
+        _ALIAS_SPECS_CACHE.clear()
+        if purge_modules:
+            _purge_aliased_modules(unregistered_alias_names)
+    return unregistered_alias_names
+
+
+def _refresh_aliased_top_level_names():
+    """Rebuild the set of aliased top-level names, in one pass over the trie."""
+    global _ALIASED_TOP_LEVEL_NAMES
+    _ALIASED_TOP_LEVEL_NAMES = frozenset(_MODULES_ALIASES_TRIE)
+
+
+def _add_module_alias(alias_name, real_name, lazy):
+    """Add an alias to the registry and its trie, without updating the set of
+    aliased top-level names, nor clearing caches."""
     assert not alias_name.startswith("."), alias_name
     assert not real_name.startswith("."), real_name
     assert (
         alias_name != real_name
     ), alias_name  # lots of other import cycles are possible though
-    entry = (alias_name, real_name)
-    if entry not in MODULES_ALIASES_REGISTRY:
-        MODULES_ALIASES_REGISTRY.append(entry)
-        return True
-    return False
+    if alias_name in MODULES_ALIASES_REGISTRY:
+        return False
+    MODULES_ALIASES_REGISTRY[alias_name] = real_name
+    if lazy:
+        LAZY_MODULES_ALIASES.add(alias_name)
+    node = _MODULES_ALIASES_TRIE
+    for segment in alias_name.split("."):
+        node = node.setdefault(segment, {})
+    node[_TRIE_VALUE] = (real_name, lazy)
+    return True
+
+
+def _remove_module_alias(alias_name):
+    """Remove an alias from the registry and its trie, without updating the set of
+    aliased top-level names, nor clearing caches."""
+    if MODULES_ALIASES_REGISTRY.pop(alias_name, None) is None:
+        return False
+    LAZY_MODULES_ALIASES.discard(alias_name)
+    segments = alias_name.split(".")
+    nodes = [_MODULES_ALIASES_TRIE]
+    for segment in segments:
+        nodes.append(nodes[-1][segment])
+    del nodes[-1][_TRIE_VALUE]
+    for index in range(len(segments), 0, -1):  # Prune empty branches
+        if nodes[index]:
+            break
+        del nodes[index - 1][segments[index - 1]]
+    return True
+
+
+def _check_module_aliases_loops(new_aliases):
+    """Raise ValueError if some new aliases would lead to infinite import loops."""
+
+    def _resolve(name):
+        segments = name.split(".")
+        for index in range(len(segments), 0, -1):
+            prefix = ".".join(segments[:index])
+            real_name = MODULES_ALIASES_REGISTRY.get(prefix) or new_aliases.get(prefix)
+            if real_name is not None:
+                return ".".join([real_name] + segments[index:])
+        return None
+
+    max_steps = len(MODULES_ALIASES_REGISTRY) + len(new_aliases) + 1
+    for alias_name, real_name in new_aliases.items():
+        name = real_name
+        for _step in range(max_steps):
+            if name is None:
+                break
+            if name == alias_name or name.startswith(alias_name + "."):
+                raise ValueError(
+                    "Alias %r -> %r would lead to an infinite import loop"
+                    % (alias_name, real_name)
+                )
+            name = _resolve(name)
+
+
+def _purge_aliased_modules(alias_names):
+    """Remove alias modules, and their submodules, from sys.modules and from the
+    attributes of their parent modules."""
+    alias_names = set(alias_names)
+    top_level_names = set(alias_name.partition(".")[0] for alias_name in alias_names)
+    purged_module_names = set()
+    for module_name in sys.modules:
+        if module_name.partition(".")[0] not in top_level_names:
+            continue
+        segments = module_name.split(".")
+        if any(
+            ".".join(segments[:index]) in alias_names
+            for index in range(1, len(segments) + 1)
+        ):
+            purged_module_names.add(module_name)
+
+    for module_name in purged_module_names:
+        module = sys.modules.pop(module_name)
+        parent_name, _, child_name = module_name.rpartition(".")
+        if parent_name in purged_module_names:
+            continue  # Parent is an alias too, i.e. possibly a real module to preserve
+        parent_module = sys.modules.get(parent_name)
+        # We don't use getattr(), which could trigger the loading of lazy modules
+        if parent_module is not None and vars(parent_module).get(child_name) is module:
+            delattr(parent_module, child_name)
+
+
+def register_moved_symbol(old_module_name, old_name, new_module_name, new_name=None):
+    """
+    Register a symbol (class, function, constant...) which was moved from a module
+    to another one, so that it remains importable from the old module.
+
+    The old module is imported, and a module-level `__getattr__` (PEP 562) is
+    installed on it (or chained onto the existing one); so the new module is only
+    imported when the symbol is first accessed, e.g. via "from old_module import X".
+    The symbol is then cached on the old module.
+
+    Returns True if the moved symbol was registered, False if it was already known
+    (in which case the first registration remains in effect).
+    """
+    return bool(
+        register_moved_symbols(
+            {(old_module_name, old_name): (new_module_name, new_name or old_name)}
+        )
+    )
+
+
+def register_moved_symbols(moved_symbols):
+    """
+    Register a batch of moved symbols, provided as a dict mapping (old module name,
+    old symbol name) pairs to (new module name, new symbol name) pairs.
+
+    Returns the list of (old module name, old symbol name) pairs which were actually
+    registered (i.e. not already known).
+    """
+    registered_symbols = []
+    for old_location, new_location in moved_symbols.items():
+        old_module_name, old_name = old_location
+        new_module_name, new_name = new_location
+        assert old_module_name != new_module_name or old_name != new_name, old_name
+        module_moved_symbols = MOVED_SYMBOLS_REGISTRY.get(old_module_name)
+        if module_moved_symbols is None:
+            old_module = importlib.import_module(old_module_name)
+            module_moved_symbols = MOVED_SYMBOLS_REGISTRY[old_module_name] = {}
+            old_module.__getattr__ = _make_moved_symbols_getattr(
+                old_module, module_moved_symbols
+            )
+        if old_name in module_moved_symbols:
+            continue
+        module_moved_symbols[old_name] = (new_module_name, new_name)
+        registered_symbols.append((old_module_name, old_name))
+    return registered_symbols
+
+
+def _make_moved_symbols_getattr(module, module_moved_symbols):
+    """Build a module-level __getattr__ resolving the moved symbols of a module, and
+    else delegating to the previous module-level __getattr__ if any."""
+    previous_getattr = vars(module).get("__getattr__")
+
+    def __getattr__(name):
+        new_location = module_moved_symbols.get(name)
+        if new_location is not None:
+            new_module_name, new_name = new_location
+            symbol = getattr(importlib.import_module(new_module_name), new_name)
+            setattr(module, name, symbol)  # Cached for next accesses
+            return symbol
+        if previous_getattr is not None:
+            return previous_getattr(name)
+        raise AttributeError(
+            "module %r has no attribute %r" % (module.__name__, name)
+        )
+
+    return __getattr__
+
+
+def set_alias_hits_reporter(reporter):
+    """
+    Set an object, having an `emit_warning(message, category)` method (e.g. a
+    PatchingUtilities instance), which will be used to emit a DeprecationWarning the
+    first time each alias is looked up by the import system.
+
+    Provide None to disable these warnings.
+    """
+    global _alias_hits_reporter
+    assert reporter is None or hasattr(reporter, "emit_warning"), reporter
+    _alias_hits_reporter = reporter
+
+
+def get_alias_hits_snapshot():
+    """
+    Return a dict mapping the alias module names, which were looked up by the import
+    system, to dicts with usage statistics:
+
+    - "real_name": the name of the real module
+    - "hits": the number of lookups of the alias (i.e. imports and find_spec() calls
+      done while the alias wasn't in sys.modules)
+    - "first_hit_stack": the formatted stack of the first lookup, as a list of strings
+    - "create_module_seconds": the total time spent loading the real module
+    """
+    with _ALIAS_HITS_LOCK:
+        return {
+            alias_name: dict(
+                alias_hits, first_hit_stack=list(alias_hits["first_hit_stack"])
+            )
+            for alias_name, alias_hits in _ALIAS_HITS.items()
+        }
+
+
+def reset_alias_hits():
+    """Clear usage statistics of aliases (and thus re-enable warnings on first hits)."""
+    with _ALIAS_HITS_LOCK:
+        _ALIAS_HITS.clear()
+
+
+def _record_alias_hit(alias_name, real_name):
+    with _ALIAS_HITS_LOCK:
+        alias_hits = _ALIAS_HITS.get(alias_name)
+        if alias_hits is not None:
+            alias_hits["hits"] += 1
+            return
+        import traceback
+
+        _ALIAS_HITS[alias_name] = dict(
+            real_name=real_name,
+            hits=1,
+            first_hit_stack=traceback.format_stack(limit=_FIRST_HIT_STACK_LIMIT),
+            create_module_seconds=0.0,
+        )
+    reporter = _alias_hits_reporter
+    if reporter is not None:
+        reporter.emit_warning(
+            "Module %r was imported via its alias %r, which is deprecated."
+            % (real_name, alias_name),
+            category=DeprecationWarning,
+        )
+
+
+def _record_alias_loading_time(alias_name, duration):
+    with _ALIAS_HITS_LOCK:
+        alias_hits = _ALIAS_HITS.get(alias_name)
+        if alias_hits is not None:
+            alias_hits["create_module_seconds"] += duration
 
 
 def _get_module_alias_real_name(fullname):
     """
     Returns the real name of module (when fullname is an alias name) or None.
+
+    The longest matching alias wins, and only this prefix of fullname is replaced.
     """
-    for k, v in MODULES_ALIASES_REGISTRY:
-        if (k == fullname) or fullname.startswith(k + "."):
-            return fullname.replace(k, v)
-    return None
+    resolution = _resolve_module_alias(fullname)
+    return resolution[0] if resolution else None
+
+
+def _resolve_module_alias(fullname):
+    """
+    Returns a (real name, is lazy) pair if fullname is an alias name, else None.
+    """
+    segments = fullname.split(".")
+    node = _MODULES_ALIASES_TRIE
+    match = None
+    for index, segment in enumerate(segments):
+        node = node.get(segment)
+        if node is None:
+            break
+        if _TRIE_VALUE in node:
+            match = (index, node[_TRIE_VALUE])
+    if match is None:
+        return None
+    index, (real_name, lazy) = match
+    return ".".join([real_name] + segments[index + 1 :]), lazy
 
 
 try:
@@ -97,6 +449,8 @@ except ImportError:
     class ModuleAliasFinder(object):
         @classmethod
         def find_module(self, fullname, *args, **kwargs):
+            if fullname.partition(".")[0] not in _ALIASED_TOP_LEVEL_NAMES:
+                return None  # fast path for unrelated imports
             real_name = _get_module_alias_real_name(fullname)
             if real_name is None:
                 return None  # no aliased module is known
@@ -109,21 +463,124 @@ else:
 
     _is_new_style_proxifier = True
 
+    import importlib.util
+
+    _LAZY_LOADING_LOCK = threading.Lock()  # Protects creation of per-module locks
+    _LAZY_MODULE_LOCKS = {}  # id(module) -> RLock held during its execution
+    _LAZY_EXECUTING_THREADS = {}  # id(module) -> ident of the thread executing it
+
+    # Attributes probed by the import system, which must not trigger lazy loading
+    # (if defined, they're set from the module spec before execution anyway)
+    _IMPORT_SYSTEM_ATTRIBUTES = frozenset(
+        [
+            "__name__",
+            "__loader__",
+            "__package__",
+            "__spec__",
+            "__path__",
+            "__file__",
+            "__cached__",
+        ]
+    )
+
+    class _LazyAliasedModule(types.ModuleType):
+        """Class of real modules not executed yet, since only imported via lazy
+        aliases; their loading is triggered by the access to a missing attribute."""
+
+        def __getattr__(self, name):
+            if name in _IMPORT_SYSTEM_ATTRIBUTES:
+                raise AttributeError(name)
+            module_id = id(self)
+            if _LAZY_EXECUTING_THREADS.get(module_id) == threading.get_ident():
+                # Circular access during execution, like for any partially
+                # initialized module
+                raise AttributeError(
+                    "partially initialized module %r has no attribute %r"
+                    % (self.__name__, name)
+                )
+            lock = _LAZY_MODULE_LOCKS.get(module_id)
+            if lock is None:
+                with _LAZY_LOADING_LOCK:
+                    lock = _LAZY_MODULE_LOCKS.setdefault(module_id, threading.RLock())
+            with lock:  # Other threads wait until the module is executed
+                if type(self) is _LazyAliasedModule:  # Not loaded by another thread
+                    _execute_lazy_aliased_module(self)
+            return getattr(self, name)
+
+    def _execute_lazy_aliased_module(module):
+        """Execute the real module, which only stops being lazy on success, so that
+        a failure is raised again by next accesses."""
+        module_id = id(module)
+        alias_spec = module.__spec__
+        real_spec = _unwrap_alias_spec(alias_spec)  # Never the no-op AliasingLoader
+        module.__spec__ = real_spec  # Proper context for relative imports etc.
+        _LAZY_EXECUTING_THREADS[module_id] = threading.get_ident()
+        try:
+            real_spec.loader.exec_module(module)
+            module.__class__ = types.ModuleType  # Stop triggering lazy loading
+            _LAZY_MODULE_LOCKS.pop(module_id, None)
+        finally:
+            del _LAZY_EXECUTING_THREADS[module_id]
+            module.__spec__ = alias_spec  # Like for non-lazy aliases
+
+    def _unwrap_alias_spec(spec):
+        """Return the original spec of a module, even if it was already imported via
+        an alias (in which case its __spec__ is the ModuleSpec of this alias)."""
+        while spec is not None and spec.origin == "alias":
+            aliased_spec = spec.loader_state["aliased_spec"]
+            assert aliased_spec is not spec, spec  # Would loop forever
+            spec = aliased_spec
+        return spec
+
+    def _create_lazy_aliased_module(real_name):
+        """Create the real module without executing it, and register it in sys.modules
+        and in its parent package, like a normal import would do."""
+        real_spec = importlib.util.find_spec(real_name)  # Imports parent packages
+        if real_spec is None:
+            raise ModuleNotFoundError("No module named %r" % real_name, name=real_name)
+        if not hasattr(real_spec.loader, "exec_module"):
+            return None  # Lazy loading not supported
+        module = importlib.util.module_from_spec(real_spec)
+        if type(module) is not types.ModuleType:
+            return None  # E.g. extension modules, already executed by creation
+        module.__class__ = _LazyAliasedModule
+        sys.modules[real_name] = module
+        parent_name, _, child_name = real_name.rpartition(".")
+        if parent_name:
+            setattr(sys.modules[parent_name], child_name, module)
+        return module
+
     class AliasingLoader(importlib.abc.Loader):
 
         target_spec_backup = None
 
-        def __init__(self, real_name, alias_name):
+        def __init__(self, real_name, alias_name, lazy=False):
             self.real_name = real_name
             self.alias_name = alias_name
+            self.lazy = lazy
 
         def create_module(self, spec):
+            start_time = time.perf_counter()
+            try:
+                return self._create_module(spec)
+            finally:
+                _record_alias_loading_time(
+                    self.alias_name, time.perf_counter() - start_time
+                )
+
+        def _create_module(self, spec):
             # We do the real loading of aliased module here
             with enrich_import_error(self.alias_name):
-                module = importlib.import_module(self.real_name, package=None)
+                module = None
+                if self.lazy and self.real_name not in sys.modules:
+                    module = _create_lazy_aliased_module(self.real_name)
+                if module is None:
+                    module = importlib.import_module(self.real_name, package=None)
             # Normally we have module.__name__ == self.real_name here, but it's not reliable
             # e.g. six "_importer" delivers six.moves.urllib.parse module with __name__ six.moves.urllib_parse
-            self.target_spec_backup = module.__spec__
+            # If the module was already imported via an alias (e.g. this one, before a
+            # sys.modules purge), its __spec__ is an alias spec, which must be unwrapped
+            self.target_spec_backup = _unwrap_alias_spec(module.__spec__)
             return module
 
         def exec_module(self, module):
@@ -131,8 +588,11 @@ else:
             # (in addition to false names set by custom importers, as described above)
             module.__name__ = self.real_name
             assert module.__spec__.origin == "alias", module.__spec__  # well overridden
-            assert module.__spec__.loader_state["aliased_spec"] is None
+            # Note that "aliased_spec" might already be set, since specs are cached
+            # and thus reused if the alias is imported again after a sys.modules purge;
+            # the target spec was unwrapped, so it's then the same real module spec
             assert self.target_spec_backup, self.target_spec_backup
+            assert self.target_spec_backup is not module.__spec__, module.__spec__
             module.__spec__.loader_state["aliased_spec"] = self.target_spec_backup
             pass  # nothing else to do, module already loaded
 
@@ -147,13 +607,33 @@ else:
 
             # print("MetaPathFinder FINDSPEC", fullname, args, kwargs)
 
-            real_name = _get_module_alias_real_name(fullname)
-            if real_name is None:
-                return None  # no aliased module is known
+            spec = _ALIAS_SPECS_CACHE.get(fullname, _NOT_CACHED)
+            if spec is _NOT_CACHED:
+                if fullname.partition(".")[0] not in _ALIASED_TOP_LEVEL_NAMES:
+                    return None  # fast path for unrelated imports
+                spec = cls._build_spec(fullname)
+                _ALIAS_SPECS_CACHE[fullname] = spec
 
-            # TODO emit warnings/logging
+            if spec is not None:
+                _record_alias_hit(fullname, spec.loader.real_name)
+            return spec
+
+        @classmethod
+        def invalidate_caches(cls):
+            # Must be a classmethod, since the class itself is put in sys.meta_path
+            _ALIAS_SPECS_CACHE.clear()
 
-            alias_loader = AliasingLoader(real_name=real_name, alias_name=fullname)
+        @staticmethod
+        def _build_spec(fullname):
+
+            resolution = _resolve_module_alias(fullname)
+            if resolution is None:
+                return None  # no aliased module is known
+            real_name, lazy = resolution
+
+            alias_loader = AliasingLoader(
+                real_name=real_name, alias_name=fullname, lazy=lazy
+            )
 
             spec = importlib.machinery.ModuleSpec(
                 name=fullname,
@@ -166,13 +646,67 @@ else:
             return spec
 
 
-def install_import_proxifier():
+def install_import_proxifier(after_builtin_finders=False):
     """
     Add a meta path hook before all others, so that new module loadings
     may be redirected to aliased module.
 
-    Idempotent function.
+    If `after_builtin_finders` is True, the hook is instead inserted after the
+    finders of builtin and frozen modules, so that imports of these modules don't go
+    through it (aliases must then not collide with builtin/frozen module names).
+
+    Idempotent function (the position of an already installed hook is not changed).
     """
     if ModuleAliasFinder not in sys.meta_path:
-        sys.meta_path.insert(0, ModuleAliasFinder)
+        position = 0
+        if after_builtin_finders and _is_new_style_proxifier:
+            builtin_finders = (
+                importlib.machinery.BuiltinImporter,
+                importlib.machinery.FrozenImporter,
+            )
+            for index, finder in enumerate(sys.meta_path):
+                if finder in builtin_finders:
+                    position = index + 1
+        sys.meta_path.insert(position, ModuleAliasFinder)
     assert ModuleAliasFinder in sys.meta_path, sys.meta_path
+
+
+def preload_aliased_submodules(alias_name, submodule_names=None):
+    """
+    Register in sys.modules, in a single pass, the aliases of all the submodules of
+    the real module which are already loaded (instead of letting each of them go
+    through the import hooks on first import via the alias).
+
+    `alias_name` must be a registered alias, which gets imported if needed.
+    `submodule_names` may be a list of names of submodules (relative to the real
+    module, e.g. "sub.subsub") to import beforehand.
+
+    The __spec__ of preloaded modules is set like for normal alias imports.
+
+    Returns the list of alias names which were added to sys.modules.
+    """
+    assert _is_new_style_proxifier
+    real_name = MODULES_ALIASES_REGISTRY[alias_name]
+    importlib.import_module(alias_name)
+    for submodule_name in submodule_names or ():
+        importlib.import_module(real_name + "." + submodule_name)
+
+    real_prefix = real_name + "."
+    preloaded_alias_names = []
+    for module_name, module in list(sys.modules.items()):
+        if module is None or not module_name.startswith(real_prefix):
+            continue  # None is used to block imports of modules
+        submodule_alias_name = alias_name + module_name[len(real_name) :]
+        if submodule_alias_name in sys.modules:
+            continue
+        if _get_module_alias_real_name(submodule_alias_name) != module_name:
+            continue  # Another alias takes precedence
+        spec = _ALIAS_SPECS_CACHE.get(submodule_alias_name)
+        if spec is None:
+            spec = ModuleAliasFinder._build_spec(submodule_alias_name)
+            _ALIAS_SPECS_CACHE[submodule_alias_name] = spec
+        spec.loader_state["aliased_spec"] = _unwrap_alias_spec(module.__spec__)
+        module.__spec__ = spec
+        sys.modules[submodule_alias_name] = module
+        preloaded_alias_names.append(submodule_alias_name)
+    return preloaded_alias_names
@@ -0,0 +1,113 @@
+from __future__ import absolute_import, print_function, unicode_literals
+
+import contextlib
+import threading
+import time
+
+#: Lock key used by patchers which don't declare their own lock keys
+GLOBAL_LOCK_KEY = ""  # Sorts before all other keys
+
+#: Lock meant to globally protect the patching workflow of patchers without lock keys
+PATCHING_LOCK = threading.RLock()
+
+_PATCHING_LOCKS = {GLOBAL_LOCK_KEY: PATCHING_LOCK}
+_PATCHING_LOCKS_LOCK = threading.Lock()  # Protects creation of new locks only
+_HELD_LOCK_KEYS = threading.local()  # Per-thread stack of lock keys
+
+_lock_wait_reporter = None  # Callable receiving (lock_key, wait_duration_seconds)
+
+
+def get_lock_key(lock_reference):
+    """
+    Return the string lock key corresponding to a patched-software name (returned
+    as is), or to a patching registry (its family prefix suffixed with its id).
+    """
+    if isinstance(lock_reference, str):
+        return lock_reference
+    family_prefix = getattr(
+        lock_reference, "_family_prefix", lock_reference.__class__.__name__
+    )
+    return "%s@%x" % (family_prefix, id(lock_reference))
+
+
+def get_patching_lock(lock_reference):
+    """Return the recursive lock dedicated to this lock key or object."""
+    lock_key = get_lock_key(lock_reference)
+    lock = _PATCHING_LOCKS.get(lock_key)
+    if lock is None:
+        with _PATCHING_LOCKS_LOCK:
+            lock = _PATCHING_LOCKS.setdefault(lock_key, threading.RLock())
+    return lock
+
+
+def set_lock_wait_reporter(reporter):
+    """
+    Set a callable which will receive the lock key and the time spent (in seconds)
+    waiting for it, each time a patching lock is acquired.
+
+    Provide None to disable this instrumentation.
+    """
+    global _lock_wait_reporter
+    assert reporter is None or callable(reporter), reporter
+    _lock_wait_reporter = reporter
+
+
+def _get_held_lock_keys():
+    held_lock_keys = getattr(_HELD_LOCK_KEYS, "stack", None)
+    if held_lock_keys is None:
+        held_lock_keys = _HELD_LOCK_KEYS.stack = []
+    return held_lock_keys
+
+
+def _acquire_lock(lock_key, lock):
+    reporter = _lock_wait_reporter
+    if reporter is None:
+        lock.acquire()
+        return
+    start = time.perf_counter()
+    lock.acquire()
+    try:
+        reporter(lock_key, time.perf_counter() - start)
+    except BaseException:
+        lock.release()
+        raise
+
+
+@contextlib.contextmanager
+def acquire_patching_locks(lock_references):
+    """
+    Acquire the patching locks of all these lock keys or objects, always in the same
+    (sorted) order, and release them on exit.
+
+    To prevent deadlocks, a thread already holding patching locks may only acquire
+    new locks which sort after the ones it holds, else RuntimeError is raised; an
+    outer patcher calling other patchers must thus declare their lock keys too.
+    Since GLOBAL_LOCK_KEY sorts first, a keyed patcher calling patchers without
+    lock keys must declare GLOBAL_LOCK_KEY among its own lock keys.
+    """
+    lock_keys = sorted(set(get_lock_key(ref) for ref in lock_references))
+    held_lock_keys = _get_held_lock_keys()
+    new_lock_keys = [key for key in lock_keys if key not in held_lock_keys]
+    if held_lock_keys and new_lock_keys and new_lock_keys[0] < max(held_lock_keys):
+        if new_lock_keys[0] == GLOBAL_LOCK_KEY:
+            raise RuntimeError(
+                "Global patching lock can't be acquired while holding %r, declare "
+                "GLOBAL_LOCK_KEY in the lock keys of the outer patcher"
+                % max(held_lock_keys)
+            )
+        raise RuntimeError(
+            "Patching lock %r can't be acquired while holding %r, declare it in the "
+            "lock keys of the outer patcher" % (new_lock_keys[0], max(held_lock_keys))
+        )
+
+    acquired_lock_keys = []
+    try:
+        for lock_key in lock_keys:
+            _acquire_lock(lock_key, get_patching_lock(lock_key))
+            acquired_lock_keys.append(lock_key)
+            held_lock_keys.append(lock_key)
+        yield
+    finally:
+        for lock_key in reversed(acquired_lock_keys):
+            held_lock_keys.pop()
+            get_patching_lock(lock_key).release()
@@ -1,43 +1,54 @@
 from __future__ import absolute_import, print_function, unicode_literals
 
-from functools import reduce
-from io import open
+import csv
+import hashlib
+import json
+import os
+from io import open, StringIO
 
 from compat_patcher_core.utilities import detuplify_software_version
 
+README_FINGERPRINT_PREFIX = ".. fixers-table-fingerprint: "
 
-def make_table(grid):
+
+def write_table(stream, grid):
     """
-    Borrowed from http://stackoverflow.com/a/12539081/5088990
-    :param grid: List of lists
-    :return:
+    Write a restructuredtext grid table to a text stream, row by row.
+
+    Each column gets its own width, computed in a single pass over the cells.
+
+    :param stream: Text stream with a write() method
+    :param grid: List of lists of strings, the first one being the table headers
     """
+    column_widths = [2 + max(len(cell) for cell in column) for column in zip(*grid)]
+
+    def _table_div(char):
+        return "+" + "+".join(width * char for width in column_widths) + "+\n"
 
-    def _table_div(num_cols, col_width, header_flag):
-        if header_flag == 1:
-            return num_cols * ("+" + (col_width) * "=") + "+\n"
-        else:
-            return num_cols * ("+" + (col_width) * "-") + "+\n"
-
-    def _normalize_cell(string, length):
-        return string + ((length - len(string)) * " ")
-
-    cell_width = 2 + max(
-        reduce(lambda x, y: x + y, [[len(item) for item in row] for row in grid], [])
-    )
-    num_cols = len(grid[0])
-    rst = _table_div(num_cols, cell_width, 0)
-    header_flag = 1
-    for row in grid:
-        rst = (
-            rst
-            + "| "
-            + "| ".join([_normalize_cell(x, cell_width - 1) for x in row])
+    row_div = _table_div("-")
+    header_div = _table_div("=")
+
+    stream.write(row_div)
+    for index, row in enumerate(grid):
+        stream.write(
+            "| "
+            + "| ".join(
+                cell.ljust(width - 1) for cell, width in zip(row, column_widths)
+            )
             + "|\n"
         )
-        rst = rst + _table_div(num_cols, cell_width, header_flag)
-        header_flag = 0
-    return rst
+        stream.write(header_div if index == 0 else row_div)
+
+
+def make_table(grid):
+    """
+    Initially borrowed from http://stackoverflow.com/a/12539081/5088990
+    :param grid: List of lists
+    :return: The restructuredtext table, as a string
+    """
+    stream = StringIO()
+    write_table(stream, grid)
+    return stream.getvalue()
 
 
 def _create_fixer_list(all_fixers, grid):
@@ -66,32 +77,203 @@ def _create_headers(grid):
     grid.append(table_headers)
 
 
-def _make_rst_table(patching_registry):
+def _get_sorted_fixers(patching_registry):
     all_fixers = patching_registry.get_all_fixers()
     all_fixers.sort(key=lambda f: (f["fixer_reference_version"], f["fixer_id"]))
+    return all_fixers
+
+
+def _make_fixers_grid(all_fixers):
     grid = []
     _create_headers(grid=grid)
     _create_fixer_list(all_fixers, grid=grid)
+    return grid
+
+
+def _make_rst_table(patching_registry):
+    grid = _make_fixers_grid(_get_sorted_fixers(patching_registry))
     rst_table = make_table(grid=grid)
     return rst_table
 
 
-def generate_readme(input_filename, output_filename, patching_registry):
+def _compute_readme_fingerprint(readme_manual_content, patching_registry):
+    hasher = hashlib.sha256()
+    hasher.update(patching_registry.get_fingerprint().encode("ascii"))
+    hasher.update(readme_manual_content.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _read_readme_fingerprint(output_filename):
+    """Return the fingerprint stored at the end of an existing readme, or None."""
+    if not os.path.exists(output_filename):
+        return None
+    fingerprint = None
+    with open(output_filename, mode="r", encoding="utf-8") as readme_final:
+        for line in readme_final:
+            if line.startswith(README_FINGERPRINT_PREFIX):
+                fingerprint = line[len(README_FINGERPRINT_PREFIX) :].strip()
+    return fingerprint
+
+
+def _read_file_bytes(filename):
+    with open(filename, mode="rb") as f:
+        return f.read()
+
+
+def generate_readme(input_filename, output_filename, patching_registry, force=False):
     """
     Take an input file in RESTRUCTUREDTEXT format, append the table of available fixers to it,
     and generate the actual readme.
-    """
-    patching_registry.populate()
 
+    A fingerprint of the fixers metadata and of the input file is stored as a RST comment
+    at the end of the readme, so that generation is skipped when nothing changed; and the
+    readme file is only rewritten if its content actually differs.
+
+    :param force: regenerate the readme even if fingerprints match
+    :return: True if the readme file was (re)written, else False
+    """
     with open(input_filename, mode="r", encoding="utf-8") as readme_manual:
         readme_manual_content = readme_manual.read()
 
-    result = readme_manual_content + "\n\n"
-    result += "Table of fixers\n===============\n\n"
-    result += "There are currently {} fixers available.\n\n".format(
-        len(patching_registry.get_all_fixers())
-    )
-    result += _make_rst_table(patching_registry)
+    fingerprint = _compute_readme_fingerprint(readme_manual_content, patching_registry)
+    if not force and _read_readme_fingerprint(output_filename) == fingerprint:
+        return False
+
+    all_fixers = _get_sorted_fixers(patching_registry)
+
+    temp_filename = "%s.%d.tmp" % (output_filename, os.getpid())
+    with open(temp_filename, mode="w", encoding="utf-8") as readme_final:
+        readme_final.write(readme_manual_content + "\n\n")
+        readme_final.write("Table of fixers\n===============\n\n")
+        readme_final.write(
+            "There are currently {} fixers available.\n\n".format(len(all_fixers))
+        )
+        write_table(readme_final, _make_fixers_grid(all_fixers))
+        readme_final.write("\n{}{}\n".format(README_FINGERPRINT_PREFIX, fingerprint))
+
+    if os.path.exists(output_filename) and _read_file_bytes(
+        output_filename
+    ) == _read_file_bytes(temp_filename):
+        os.remove(temp_filename)
+        return False
+    os.replace(temp_filename, output_filename)
+    return True
+
+
+#: Fields of fixers exported by catalog writers, in this order
+CATALOG_FIELDS = (
+    "fixer_family",
+    "fixer_id",
+    "fixer_qualified_name",
+    "fixer_reference_version",
+    "fixer_applied_from_version",
+    "fixer_applied_upto_version",
+    "feature_supported_from_version",
+    "feature_supported_upto_version",
+    "fixer_tags",
+    "fixer_explanation",
+)
+
+_CATALOG_VERSION_FIELDS = (
+    "fixer_reference_version",
+    "fixer_applied_from_version",
+    "fixer_applied_upto_version",
+    "feature_supported_from_version",
+    "feature_supported_upto_version",
+)
+
+_CATALOG_FORMATS_BY_EXTENSION = {
+    ".jsonl": "jsonl",
+    ".csv": "csv",
+    ".md": "markdown",
+}
+
+
+def _get_catalog_record(fixer):
+    """Return a dict of JSON-serializable metadata of this fixer."""
+    record = dict((field, fixer[field]) for field in CATALOG_FIELDS)
+    for field in _CATALOG_VERSION_FIELDS:
+        record[field] = detuplify_software_version(record[field])
+    record["fixer_tags"] = list(record["fixer_tags"])
+    record["fixer_explanation"] = record["fixer_explanation"].strip()
+    return record
+
+
+def _get_flat_catalog_row(record):
+    """Return a list of strings, in CATALOG_FIELDS order."""
+    row = []
+    for field in CATALOG_FIELDS:
+        value = record[field]
+        if field == "fixer_tags":
+            value = ",".join(value)
+        row.append(value or "")
+    return row
+
+
+def _write_catalog_as_jsonl(stream, records):
+    for record in records:
+        stream.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def _write_catalog_as_csv(stream, records):
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(CATALOG_FIELDS)
+    for record in records:
+        writer.writerow(_get_flat_catalog_row(record))
+
+
+def _escape_markdown_cell(value):
+    return " ".join(value.split()).replace("|", "\\|")
 
-    with open(output_filename, mode="w", encoding="utf-8") as readme_final:
-        readme_final.write(result)
+
+def _write_catalog_as_markdown(stream, records):
+    stream.write("| " + " | ".join(CATALOG_FIELDS) + " |\n")
+    stream.write("|" + "---|" * len(CATALOG_FIELDS) + "\n")
+    for record in records:
+        row = _get_flat_catalog_row(record)
+        stream.write(
+            "| " + " | ".join(_escape_markdown_cell(cell) for cell in row) + " |\n"
+        )
+
+
+_CATALOG_WRITERS = {
+    "jsonl": _write_catalog_as_jsonl,
+    "csv": _write_catalog_as_csv,
+    "markdown": _write_catalog_as_markdown,
+}
+
+
+def write_fixers_catalog(stream, patching_registry, format="jsonl"):
+    """
+    Stream the metadata of all fixers of a registry, in their registration order.
+
+    :param stream: Text stream with a write() method
+    :param patching_registry: PatchingRegistry or MultiPatchingRegistry
+    :param format: "jsonl" (one JSON object per fixer), "csv" or "markdown"
+    """
+    try:
+        writer = _CATALOG_WRITERS[format]
+    except KeyError:
+        raise ValueError("Unknown fixers catalog format %r" % format)
+    patching_registry.populate()
+    records = (_get_catalog_record(f) for f in patching_registry.get_all_fixers())
+    writer(stream, records)
+
+
+def generate_fixers_catalog(output_filename, patching_registry, format=None):
+    """
+    Write the catalog of all fixers of a registry to a file.
+
+    :param format: see `write_fixers_catalog()`, by default it is deduced from the
+                   extension of `output_filename` (".jsonl", ".csv" or ".md")
+    """
+    if format is None:
+        extension = os.path.splitext(output_filename)[1].lower()
+        try:
+            format = _CATALOG_FORMATS_BY_EXTENSION[extension]
+        except KeyError:
+            raise ValueError(
+                "Can't deduce fixers catalog format from filename %r" % output_filename
+            )
+    with open(output_filename, mode="w", encoding="utf-8", newline="") as catalog:
+        write_fixers_catalog(catalog, patching_registry, format=format)
@@ -2,9 +2,12 @@ from __future__ import absolute_import, print_function, unicode_literals
 
 import collections
 import itertools
+import operator
+import types
 
 from compat_patcher_core.utilities import (
     tuplify_software_version,
+    detuplify_software_version,
     _import_attribute_from_dotted_string,
 )
 
@@ -35,6 +38,15 @@ class PatchingRegistry(object):
         ), populate_callable
         self._family_prefix = family_prefix
         self._is_populated = False
+        self._is_frozen = False
+        self._frozen_fixers = None
+        self._frozen_fixers_by_qualified_name = None
+        self._frozen_fixers_by_family = None
+        self._frozen_fixer_positions = None
+        self._frozen_selections = None
+        self._frozen_fingerprint = None
+        self._fingerprint = None  # Cache, reset by registrations
+        self._fingerprint_parts = []  # Fixers metadata, serialized on registration
         self._populate_callable = populate_callable
         self._patching_registry = collections.OrderedDict()
         self._current_software_version = current_software_version
@@ -52,6 +64,13 @@ class PatchingRegistry(object):
         ), current_software_version
         return current_software_version
 
+    def _get_current_software_versions(self):
+        """
+        Returns the list of current software versions (as dotted strings) which
+        influence the selection of fixers, i.e here a single one.
+        """
+        return [detuplify_software_version(self._get_current_software_version())]
+
     def populate(self):
         """
         Trigger the registration of potential lazy fixers, which might be in other
@@ -64,6 +83,71 @@ class PatchingRegistry(object):
             self._is_populated = True
         return res
 
+    def freeze(self):
+        """
+        Populate the registry, then turn it into an immutable snapshot with precomputed
+        indexes, so that it can be queried concurrently by many threads without locking.
+
+        Fixers then become read-only mappings. Selections without inclusion/exclusion
+        lists are cached per software version, and selections with inclusion lists
+        only examine the fixers having these IDs or families.
+
+        Further registrations of fixers raise RuntimeError. Calling this method again
+        does nothing.
+        """
+        if self._is_frozen:
+            return
+        self.populate()
+        self._patching_registry = types.MappingProxyType(
+            collections.OrderedDict(
+                (fixer_id, types.MappingProxyType(dict(fixer)))
+                for (fixer_id, fixer) in self._patching_registry.items()
+            )
+        )
+        self._frozen_fixers = tuple(self._patching_registry.values())
+        self._frozen_fixers_by_qualified_name = types.MappingProxyType(
+            {fixer["fixer_qualified_name"]: fixer for fixer in self._frozen_fixers}
+        )
+        fixers_by_family = collections.OrderedDict()
+        for fixer in self._frozen_fixers:
+            fixers_by_family.setdefault(fixer["fixer_family"], []).append(fixer)
+        self._frozen_fixers_by_family = types.MappingProxyType(
+            {family: tuple(fixers) for (family, fixers) in fixers_by_family.items()}
+        )
+        self._frozen_fixer_positions = types.MappingProxyType(
+            {
+                fixer["fixer_id"]: index
+                for (index, fixer) in enumerate(self._frozen_fixers)
+            }
+        )
+        self._frozen_selections = {}  # Software version tuple -> tuple of fixers
+        self._frozen_fingerprint = self.get_fingerprint()
+        self._is_frozen = True
+
+    def _get_frozen_candidate_fixers(self, include_fixer_ids, include_fixer_families):
+        """Return, in registration order, the fixers of a frozen registry which are
+        matched by these inclusion lists (not "*")."""
+        candidate_fixers = {}
+        for fixer_id in include_fixer_ids or ():
+            fixer = self._patching_registry.get(fixer_id)
+            if fixer is None:
+                fixer = self._frozen_fixers_by_qualified_name.get(fixer_id)
+            if fixer is not None:
+                candidate_fixers[fixer["fixer_id"]] = fixer
+        for fixer_family in include_fixer_families or ():
+            for fixer in self._frozen_fixers_by_family.get(fixer_family, ()):
+                candidate_fixers[fixer["fixer_id"]] = fixer
+        positions = self._frozen_fixer_positions
+        return sorted(
+            candidate_fixers.values(), key=lambda fixer: positions[fixer["fixer_id"]]
+        )
+
+    def _ensure_not_frozen(self):
+        if self._is_frozen:
+            raise RuntimeError(
+                "Can't register fixers in frozen registry %r" % self._family_prefix
+            )
+
     @staticmethod
     def _extract_docstring(func):
         """Extract and check the docstring of a callable"""
@@ -105,6 +189,7 @@ class PatchingRegistry(object):
         `fixer_tags` is a **list** of strings, which can be used to differentiate fixers
         which will be applied at different moments of software startup.
         """
+        self._ensure_not_frozen()
 
         assert (
             isinstance(fixer_reference_version, str)
@@ -134,6 +219,7 @@ class PatchingRegistry(object):
             assert feature_supported_from_version < feature_supported_upto_version
 
         def _register_simple_fixer(func):
+            self._ensure_not_frozen()
             fixer_id = func.__name__  # untouched ATM, not fully qualified
             new_fixer = dict(
                 fixer_callable=func,
@@ -153,6 +239,8 @@ class PatchingRegistry(object):
                 "duplicate fixer id %s detected" % fixer_id
             )
             self._patching_registry[fixer_id] = new_fixer
+            self._fingerprint_parts.append(_serialize_fixer_metadata(new_fixer))
+            self._fingerprint = None
             # print("patching_registry", patching_registry)
             return func
 
@@ -160,12 +248,49 @@ class PatchingRegistry(object):
 
     def get_all_fixers(self):
         """Return the list of all fixers (as dicts) known by this registry."""
+        if self._is_frozen:
+            return list(self._frozen_fixers)
         return list(self._patching_registry.values())
 
     def get_fixer_by_id(self, fixer_id):
         """Return the fixer having this (unqualified) ID, or raise KeyError."""
         return self._patching_registry[fixer_id]
 
+    def get_fixer_by_qualified_name(self, fixer_qualified_name):
+        """Return the fixer having this qualified name (family and ID), or raise
+        KeyError."""
+        if self._is_frozen:
+            try:
+                return self._frozen_fixers_by_qualified_name[fixer_qualified_name]
+            except KeyError:
+                raise KeyError(
+                    "Fixer %r not found in patching registry" % fixer_qualified_name
+                )
+        fixer_id = fixer_qualified_name.split("|", 1)[-1]
+        fixer = self._patching_registry.get(fixer_id)
+        if fixer is None or fixer["fixer_qualified_name"] != fixer_qualified_name:
+            raise KeyError("Fixer %r not found in patching registry" % fixer_qualified_name)
+        return fixer
+
+    def get_fingerprint(self):
+        """Return a stable hash (hexadecimal string) of the metadata of all fixers of
+        this registry, which changes as soon as a fixer is added, removed or modified
+        (except for the code of fixer callables).
+
+        Metadata are serialized when fixers get registered, so that the fingerprint
+        is computed with a single hashing, once until new fixers get registered.
+
+        This method forces a populate() on the registry.
+        """
+        if self._is_frozen:
+            return self._frozen_fingerprint
+        self.populate()
+        fingerprint = self._fingerprint
+        if fingerprint is None:
+            fingerprint = _compute_fixers_fingerprint(self._fingerprint_parts)
+            self._fingerprint = fingerprint
+        return fingerprint
+
     def get_relevant_fixers(
         self,
         include_fixer_ids="*",
@@ -201,19 +326,36 @@ class PatchingRegistry(object):
 
         ALL = "*"
 
-        log = log or (lambda x: x)
-
         current_software_version = tuplify_software_version(current_software_version)
 
-        relevant_fixers = []
-
         # Shortcut for the common case "no specific inclusion/exclusion lists"
         mass_include = (
             include_fixer_ids == ALL or include_fixer_families == ALL
         ) and not any((exclude_fixer_ids, exclude_fixer_families))
 
-        for fixer_id, fixer in self._patching_registry.items():
-            assert fixer_id == fixer["fixer_id"], fixer
+        # Frozen registries have indexes, used when skipped fixers needn't be logged
+        use_frozen_indexes = self._is_frozen and log is None
+        if use_frozen_indexes and mass_include:
+            frozen_selection = self._frozen_selections.get(current_software_version)
+            if frozen_selection is not None:
+                return list(frozen_selection)
+
+        log = log or (lambda x: x)
+
+        if use_frozen_indexes and ALL not in (
+            include_fixer_ids,
+            include_fixer_families,
+        ):
+            candidate_fixers = self._get_frozen_candidate_fixers(
+                include_fixer_ids, include_fixer_families
+            )
+        else:
+            candidate_fixers = self._patching_registry.values()
+
+        relevant_fixers = []
+
+        for fixer in candidate_fixers:
+            fixer_id = fixer["fixer_id"]
             fixer_qualified_name = fixer["fixer_qualified_name"]
 
             if (
@@ -283,6 +425,9 @@ class PatchingRegistry(object):
             # cheers, this fixer has passed all filters!
             relevant_fixers.append(fixer)
 
+        if use_frozen_indexes and mass_include:
+            self._frozen_selections[current_software_version] = tuple(relevant_fixers)
+
         return relevant_fixers
 
     def get_relevant_fixer_ids(self, qualified=False, **kwargs):
@@ -306,6 +451,8 @@ class MultiPatchingRegistry(object):
     def __init__(self, registries):
         self._registry_references = registries
         self._is_populated = False
+        self._is_frozen = False
+        self._frozen_fingerprint = None
         self._registries = self._load_registries(registries)
 
     def populate(self):
@@ -316,6 +463,16 @@ class MultiPatchingRegistry(object):
             self._is_populated = True
         return res
 
+    def freeze(self):
+        """Freeze all underlying registries, see `PatchingRegistry.freeze()`."""
+        if self._is_frozen:
+            return
+        for registry in self._registries:
+            registry.freeze()
+        self._is_populated = True
+        self._frozen_fingerprint = self.get_fingerprint()
+        self._is_frozen = True
+
     @staticmethod
     def _load_registries(registry_references):
         registries = []
@@ -377,4 +534,57 @@ class MultiPatchingRegistry(object):
                 pass
         raise KeyError("Fixer %r not found in any patching registries" % fixer_id)
 
+    def get_fixer_by_qualified_name(self, fixer_qualified_name):
+        """Return the first fixer having this qualified name, or raise KeyError."""
+        for registry in self._registries:
+            try:
+                return registry.get_fixer_by_qualified_name(fixer_qualified_name)
+            except KeyError:
+                pass
+        raise KeyError(
+            "Fixer %r not found in any patching registries" % fixer_qualified_name
+        )
+
+    def _get_current_software_versions(self):
+        return self._flatten(
+            registry._get_current_software_versions() for registry in self._registries
+        )
+
+    def get_fingerprint(self):
+        """Return a stable hash of the metadata of all fixers of underlying
+        registries, combining their own fingerprints."""
+        if self._is_frozen:
+            return self._frozen_fingerprint
+        import hashlib
+
+        fingerprints = [registry.get_fingerprint() for registry in self._registries]
+        return hashlib.sha256(",".join(fingerprints).encode("ascii")).hexdigest()
+
     get_relevant_fixer_ids = PatchingRegistry.get_relevant_fixer_ids # Unmodified
+
+
+_FINGERPRINTED_FIXER_FIELDS = (
+    "fixer_qualified_name",
+    "fixer_explanation",
+    "fixer_tags",
+    "fixer_applied_from_version",
+    "fixer_applied_upto_version",
+    "feature_supported_from_version",
+    "feature_supported_upto_version",
+)
+
+_get_fingerprinted_fixer_fields = operator.itemgetter(*_FINGERPRINTED_FIXER_FIELDS)
+
+
+def _serialize_fixer_metadata(fixer):
+    """Return a stable string representation of the fingerprinted metadata of a
+    fixer (only made of strings, lists, tuples, integers and None)."""
+    return repr(
+        (_get_fingerprinted_fixer_fields(fixer), fixer["fixer_callable"].__name__)
+    )
+
+
+def _compute_fixers_fingerprint(fingerprint_parts):
+    import hashlib
+
+    return hashlib.sha256("\n".join(fingerprint_parts).encode("utf8")).hexdigest()
@@ -1,8 +1,11 @@
 from __future__ import absolute_import, print_function, unicode_literals
 
 import functools
+import os
+import sys
 
 from compat_patcher_core.exceptions import SkipFixerException
+from compat_patcher_core.tracing import NULL_TRACER
 
 
 class PatchingRunner(object):
@@ -21,16 +24,45 @@ class PatchingRunner(object):
     ]
 
     _all_applied_fixers = []  # Class attribute with qualified fixer names!
+    _all_applied_fixers_set = set()  # Same names, for fast membership checks
 
-    def __init__(self, settings, patching_registry, patching_utilities):
+    _PATCH_PLAN_FORMAT_VERSION = 2
+
+    def __init__(
+        self,
+        settings,
+        patching_registry,
+        patching_utilities,
+        patch_plan_cache_dir=None,
+        tracer=None,
+        patch_plan_key=None,
+    ):
+        """
+        If `patch_plan_cache_dir` is provided, the selected and sorted fixers are stored
+        as a "patch plan" in this directory, and reused by subsequent runners (even in
+        other processes) as long as fixers metadata, current software versions
+        and fixers settings remain the same.
+
+        Computing the fingerprint of fixers metadata requires populating the registry.
+        To avoid this cost, provide as `patch_plan_key` a string which changes whenever
+        fixers change (e.g. the version of the compat package): then, on a cache hit,
+        fixer callables are imported directly if the registry isn't populated yet.
+
+        `tracer` may be an object like `compat_patcher_core.tracing.ChromeTraceTracer`,
+        receiving spans for selection, sorting and application of each fixer.
+        """
         assert settings, settings
         self._settings = settings
         self._patching_registry = patching_registry
         self._patching_utilities = patching_utilities
+        self._patch_plan_cache_dir = patch_plan_cache_dir
+        self._patch_plan_key = patch_plan_key
+        self._tracer = tracer or NULL_TRACER
 
     @classmethod
     def _clear_all_applied_fixers(cls):  # For testing only!
         del cls._all_applied_fixers[:]
+        cls._all_applied_fixers_set.clear()
 
     def _get_patcher_setting(self, name):
         """
@@ -52,54 +84,216 @@ class PatchingRunner(object):
     def _apply_selected_fixers(self, fixers):
         fixers_just_applied = []
         for fixer in fixers:
+            with self._tracer.span(fixer["fixer_qualified_name"]) as span:
+                status = self._apply_selected_fixer(fixer)
+                span.set_attribute("status", status)
+            if status == "applied":
+                fixers_just_applied.append(fixer["fixer_id"])
+        return fixers_just_applied
 
-            fixer_qualified_name = fixer["fixer_qualified_name"]
+    def _apply_selected_fixer(self, fixer):
+        """Apply a fixer, and return a status string ("applied", "skipped" or
+        "already_applied")."""
+        fixer_qualified_name = fixer["fixer_qualified_name"]
 
-            if fixer_qualified_name not in self._all_applied_fixers:
-                self._patching_utilities.emit_log(
-                    "Compat fixer {}->{} is getting applied".format(
-                        fixer["fixer_family"], fixer["fixer_id"]
-                    ),
-                    level="INFO",
-                )
-                try:
-                    fixer["fixer_callable"](self._patching_utilities)
-                    self._all_applied_fixers.append(fixer_qualified_name)
-                    fixers_just_applied.append(fixer["fixer_id"])
-                except SkipFixerException as e:
-                    self._patching_utilities.emit_log(
-                        "Compat fixer {}->{} was actually not applied, reason: {}".format(
-                            fixer["fixer_family"], fixer["fixer_id"], e
-                        ),
-                        level="WARNING",
-                    )
-            else:
-                self._patching_utilities.emit_log(
-                    "Compat fixer {}->{} was already applied".format(["fixer_family"], fixer["fixer_id"]),
-                    level="WARNING",
-                )
-        return fixers_just_applied
+        if fixer_qualified_name in self._all_applied_fixers_set:
+            self._patching_utilities.emit_log(
+                "Compat fixer {}->{} was already applied".format(["fixer_family"], fixer["fixer_id"]),
+                level="WARNING",
+            )
+            return "already_applied"
 
-    def _get_sorted_relevant_fixers(self):
+        self._patching_utilities.emit_log(
+            "Compat fixer {}->{} is getting applied".format(
+                fixer["fixer_family"], fixer["fixer_id"]
+            ),
+            level="INFO",
+        )
+        try:
+            with self._patching_utilities._applying_fixer(fixer_qualified_name):
+                fixer["fixer_callable"](self._patching_utilities)
+        except SkipFixerException as e:
+            self._patching_utilities.emit_log(
+                "Compat fixer {}->{} was actually not applied, reason: {}".format(
+                    fixer["fixer_family"], fixer["fixer_id"], e
+                ),
+                level="WARNING",
+            )
+            return "skipped"
+        self._all_applied_fixers.append(fixer_qualified_name)
+        self._all_applied_fixers_set.add(fixer_qualified_name)
+        return "applied"
 
-        # For now, we don't need to be able to force-send a `current_software_version`
-        fixers_settings = dict(
+    def _get_fixers_settings(self):
+        return dict(
             include_fixer_ids=self._get_patcher_setting("include_fixer_ids"),
             include_fixer_families=self._get_patcher_setting("include_fixer_families"),
             exclude_fixer_ids=self._get_patcher_setting("exclude_fixer_ids"),
             exclude_fixer_families=self._get_patcher_setting("exclude_fixer_families"),
         )
-        log = functools.partial(self._patching_utilities.emit_log, level="DEBUG")
-        relevant_fixers = self._patching_registry.get_relevant_fixers(
-            log=log, **fixers_settings
-        )
 
+    def _get_sorted_relevant_fixers(self):
+
+        # For now, we don't need to be able to force-send a `current_software_version`
+        fixers_settings = self._get_fixers_settings()
+        log = None  # Lets frozen registries use their indexes
+        if self._patching_utilities._is_logging_enabled("DEBUG"):
+            log = functools.partial(self._patching_utilities.emit_log, level="DEBUG")
+        with self._tracer.span("selection") as span:
+            relevant_fixers = self._patching_registry.get_relevant_fixers(
+                log=log, **fixers_settings
+            )
+            if self._tracer.enabled:
+                fixers_count = len(self._patching_registry.get_all_fixers())
+                span.set_attribute("fixers_considered", fixers_count)
+                span.set_attribute("fixers_selected", len(relevant_fixers))
+                span.set_attribute(
+                    "fixers_skipped", fixers_count - len(relevant_fixers)
+                )
+
+        with self._tracer.span("sorting"):
+            self._sort_relevant_fixers(relevant_fixers)
+
+        return relevant_fixers
+
+    @staticmethod
+    def _sort_relevant_fixers(relevant_fixers):
+        """Sort fixers in place, in their order of application."""
         # REVERSED order is necessary for backwards compatibility, more advanced
         # sorting might be introduced to help forward-compatibility fixers...
         relevant_fixers.sort(
             key=lambda x: (x["fixer_reference_version"], x["fixer_id"]), reverse=True
         )
 
+    def _get_patch_plan_cache_filename(self):
+        import hashlib
+        import json
+
+        if self._patch_plan_key is not None:
+            registry_fingerprint = None  # Cheap key provided by the caller instead
+        else:
+            registry_fingerprint = self._patching_registry.get_fingerprint()
+        plan_key_data = dict(
+            format_version=self._PATCH_PLAN_FORMAT_VERSION,
+            patch_plan_key=self._patch_plan_key,
+            registry_fingerprint=registry_fingerprint,
+            current_software_versions=self._patching_registry._get_current_software_versions(),
+            fixers_settings=self._get_fixers_settings(),
+        )
+        plan_key = hashlib.sha256(
+            json.dumps(plan_key_data, sort_keys=True).encode("utf8")
+        ).hexdigest()
+        return os.path.join(self._patch_plan_cache_dir, "patch_plan_%s.json" % plan_key)
+
+    def _load_cached_patch_plan(self, cache_filename):
+        """Return the list of fixers stored in this patch plan file, or None if the
+        file is missing, unreadable or not matching the registry anymore.
+
+        Errors raised by the import of fixer modules are not caught."""
+        import json
+
+        try:
+            with open(cache_filename, "r") as f:
+                data = json.load(f)
+            fixer_qualified_names = data["fixer_qualified_names"]
+            fixer_callable_paths = data["fixer_callable_paths"]
+        except (EnvironmentError, ValueError, KeyError, TypeError):
+            return None  # Missing or corrupted plan file
+        if not (
+            isinstance(fixer_qualified_names, list)
+            and isinstance(fixer_callable_paths, list)
+            and len(fixer_callable_paths) == len(fixer_qualified_names)
+            and all("|" in str(name) for name in fixer_qualified_names)
+            and all(
+                path is None or "." in str(path) for path in fixer_callable_paths
+            )
+        ):
+            return None  # Corrupted plan file
+
+        fixers = []
+        if not self._patching_registry._is_populated and all(fixer_callable_paths):
+            for name, callable_path in zip(fixer_qualified_names, fixer_callable_paths):
+                fixer = self._import_cached_fixer(name, callable_path)
+                if fixer is None:
+                    return None  # Stale plan
+                fixers.append(fixer)
+            return fixers
+        for name in fixer_qualified_names:
+            try:
+                fixers.append(self._patching_registry.get_fixer_by_qualified_name(name))
+            except KeyError:
+                return None  # Stale plan
+        return fixers
+
+    @staticmethod
+    def _import_cached_fixer(fixer_qualified_name, fixer_callable_path):
+        """Return a fixer of a patch plan, as a dict with only the fields needed to
+        apply it, without populating the registry; or None if the fixer callable
+        isn't found."""
+        fixer_family, _, fixer_id = str(fixer_qualified_name).partition("|")
+        module_name, _, attr_name = str(fixer_callable_path).rpartition(".")
+        module = sys.modules.get(module_name)
+        if module is None:
+            # Builtin __import__() avoids loading importlib
+            module = __import__(module_name, fromlist=[attr_name])
+        fixer_callable = getattr(module, attr_name, None)
+        if getattr(fixer_callable, "__name__", None) != fixer_id:
+            return None
+        return dict(
+            fixer_qualified_name=fixer_qualified_name,
+            fixer_id=fixer_id,
+            fixer_family=fixer_family,
+            fixer_callable=fixer_callable,
+        )
+
+    @staticmethod
+    def _get_fixer_callable_path(fixer):
+        """Return the dotted path from which the fixer callable can be imported
+        again, or None."""
+        fixer_callable = fixer["fixer_callable"]
+        module = sys.modules.get(getattr(fixer_callable, "__module__", None))
+        attr_name = fixer_callable.__name__
+        if module is None or getattr(module, attr_name, None) is not fixer_callable:
+            return None  # E.g. fixers created by factory functions
+        return "%s.%s" % (module.__name__, attr_name)
+
+    def _save_patch_plan(self, cache_filename, fixers):
+        import json
+
+        if not os.path.isdir(self._patch_plan_cache_dir):
+            os.makedirs(self._patch_plan_cache_dir)
+        data = dict(
+            fixer_qualified_names=[f["fixer_qualified_name"] for f in fixers],
+            fixer_callable_paths=[self._get_fixer_callable_path(f) for f in fixers],
+        )
+        temp_filename = "%s.%d.tmp" % (cache_filename, os.getpid())
+        with open(temp_filename, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_filename, cache_filename)  # Atomic for concurrent workers
+
+    def _get_patch_plan(self):
+        """Return the sorted relevant fixers, using the patch plan cache if enabled."""
+        if not self._patch_plan_cache_dir:
+            return self._get_sorted_relevant_fixers()
+
+        cache_filename = self._get_patch_plan_cache_filename()
+        with self._tracer.span("patch_plan_cache_lookup") as span:
+            relevant_fixers = self._load_cached_patch_plan(cache_filename)
+            span.set_attribute("hit", relevant_fixers is not None)
+        if relevant_fixers is not None:
+            self._patching_utilities.emit_log(
+                "Patch plan loaded from cache file %s" % cache_filename, level="DEBUG"
+            )
+            return relevant_fixers
+
+        relevant_fixers = self._get_sorted_relevant_fixers()
+        try:
+            self._save_patch_plan(cache_filename, relevant_fixers)
+        except EnvironmentError as e:
+            self._patching_utilities.emit_log(
+                "Couldn't save patch plan to cache file %s: %r" % (cache_filename, e),
+                level="WARNING",
+            )
         return relevant_fixers
 
     def patch_software(self):
@@ -109,8 +303,9 @@ class PatchingRunner(object):
         were successfully applied during this call.
         """
 
-        relevant_fixers = self._get_sorted_relevant_fixers()
+        with self._tracer.span("patch_software"):
+            relevant_fixers = self._get_patch_plan()
 
-        fixers_just_applied = self._apply_selected_fixers(relevant_fixers)
+            fixers_just_applied = self._apply_selected_fixers(relevant_fixers)
 
         return dict(fixers_just_applied=fixers_just_applied)
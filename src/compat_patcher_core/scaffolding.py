@@ -1,15 +1,233 @@
+_LEGACY_FORBIDDEN_PHRASES = (r"^\s*import.* warnings", r"^\s*from warnings")
+
+# Files with more python sources than this get scanned in a process pool
+_MIN_FILES_FOR_PROCESS_POOL = 64
+
+_SCAN_CACHE_FORMAT_VERSION = 1
+
+
+def _is_allowed_stdlib_warnings_import(filename, statement):
+    # The only case OK is our own warnings utility
+    return filename == "utilities.py" and statement == (
+        "import " + "warnings as stdlib_warnings"
+    )
+
+
+def _scan_python_source(full_path, data, forbidden_modules):
+    """Return the list of (lineno, statement) pairs of imports of forbidden modules
+    in this python source, or None if it couldn't be parsed."""
+    import ast
+
+    try:
+        tree = ast.parse(data, filename=full_path)
+    except (SyntaxError, ValueError):
+        return None
+
+    def _is_forbidden(module_name):
+        return any(
+            module_name == forbidden_module
+            or module_name.startswith(forbidden_module + ".")
+            for forbidden_module in forbidden_modules
+        )
+
+    def _format_names(names):
+        return ", ".join(
+            alias.name + (" as " + alias.asname if alias.asname else "")
+            for alias in names
+        )
+
+    findings = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(_is_forbidden(alias.name) for alias in node.names):
+                statement = "import " + _format_names(node.names)
+                findings.append((node.lineno, statement))
+        elif isinstance(node, ast.ImportFrom):
+            if not node.level and _is_forbidden(node.module or ""):
+                statement = "from %s import %s" % (
+                    node.module,
+                    _format_names(node.names),
+                )
+                findings.append((node.lineno, statement))
+    findings.sort()
+    return findings
+
+
+def _scan_python_file(full_path, forbidden_modules):
+    """Worker function: return the (content hash, findings) pair of a python file."""
+    import hashlib
+
+    with open(full_path, "rb") as stream:
+        data = stream.read()
+    content_hash = hashlib.sha1(data).hexdigest()
+    return content_hash, _scan_python_source(full_path, data, forbidden_modules)
+
+
+def _load_scan_cache(cache_path, forbidden_modules):
+    import json
+
+    try:
+        with open(cache_path, "r") as stream:
+            cache = json.load(stream)
+    except (OSError, ValueError):
+        return {}
+    try:
+        if cache["version"] != _SCAN_CACHE_FORMAT_VERSION or cache[
+            "forbidden_modules"
+        ] != list(forbidden_modules):
+            return {}
+        cached_files = cache["files"]
+        for cached_entry in cached_files.values():
+            cached_entry["hash"], cached_entry["findings"]  # Used by the scan
+    except (KeyError, AttributeError, TypeError):
+        return {}  # Malformed cache file, e.g. truncated by hand
+    return cached_files
+
+
+def _save_scan_cache(cache_path, forbidden_modules, cached_files):
+    """Save the scan cache, ignoring errors, since it's only an optimization."""
+    import json, os
+
+    temp_path = "%s.%d.tmp" % (cache_path, os.getpid())
+    try:
+        with open(temp_path, "w") as stream:
+            json.dump(
+                dict(
+                    version=_SCAN_CACHE_FORMAT_VERSION,
+                    forbidden_modules=list(forbidden_modules),
+                    files=cached_files,
+                ),
+                stream,
+            )
+        os.replace(temp_path, cache_path)  # Atomic, in case of concurrent test runs
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def scan_forbidden_imports(
+    source_root, forbidden_modules=("warnings",), cache_path=None, max_workers=None
+):
+    """
+    Find, via python AST analysis, all imports of `forbidden_modules` (and their
+    submodules) in the python source files under `source_root`.
+
+    Unlike a text search, this ignores strings and comments. Python files
+    which can't be parsed are reported with a None line number.
+
+    Big source trees are scanned in a process pool (of `max_workers` processes,
+    use 1 to disable it). If `cache_path` is provided, the results are stored
+    in this JSON file, and files with unchanged content are not parsed again on
+    next runs.
+
+    Returns a dict with fields "analysed_files" (list of full paths), and
+    "findings" (list of (full path, line number, normalized import statement)
+    tuples).
+    """
+    import hashlib, os
+
+    forbidden_modules = tuple(forbidden_modules)
+    cached_files = _load_scan_cache(cache_path, forbidden_modules) if cache_path else {}
+
+    analysed_files = []
+    for root, _subdirs, files in os.walk(source_root):
+        for f in files:
+            if f.endswith(".py"):
+                analysed_files.append(os.path.join(root, f))
+
+    results = {}
+    files_to_scan = []
+    for full_path in analysed_files:
+        cached_entry = cached_files.get(full_path)
+        if cached_entry is not None:
+            with open(full_path, "rb") as stream:
+                content_hash = hashlib.sha1(stream.read()).hexdigest()
+            if content_hash == cached_entry["hash"]:
+                results[full_path] = cached_entry
+                continue
+        files_to_scan.append(full_path)
+
+    if len(files_to_scan) >= _MIN_FILES_FOR_PROCESS_POOL and max_workers != 1:
+        import concurrent.futures
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+            scan_results = list(
+                pool.map(
+                    _scan_python_file,
+                    files_to_scan,
+                    [forbidden_modules] * len(files_to_scan),
+                    chunksize=16,
+                )
+            )
+    else:
+        scan_results = [
+            _scan_python_file(full_path, forbidden_modules)
+            for full_path in files_to_scan
+        ]
+
+    for full_path, (content_hash, file_findings) in zip(files_to_scan, scan_results):
+        results[full_path] = dict(hash=content_hash, findings=file_findings)
+
+    if cache_path and files_to_scan:
+        _save_scan_cache(cache_path, forbidden_modules, results)
+
+    findings = []
+    for full_path in analysed_files:
+        file_findings = results[full_path]["findings"]
+        if file_findings is None:
+            findings.append((full_path, None, None))  # Unparsable file
+            continue
+        for lineno, statement in file_findings:
+            findings.append((full_path, lineno, statement))
+
+    return dict(analysed_files=analysed_files, findings=findings)
+
+
 def ensure_no_stdlib_warnings(
     source_root,
     # we authorize "warnings.warn", as long as it uses the custom WarningsProxy above
-    forbidden_phrases=(r"^\s*import.* warnings", r"^\s*from warnings"),
+    forbidden_phrases=None,
+    cache_path=None,
+    max_workers=None,
 ):
     """
     This utility should be used by each compat patcher user, to ensure all shims only
     go through the configurable compat-patcher warnings system.
 
+    Imports of the stdlib "warnings" module are detected by `scan_forbidden_imports()`
+    (see its documentation for `cache_path` and `max_workers` parameters), and a
+    ValueError is raised for the first one found. Unparsable python files are
+    checked with the legacy regular expressions instead.
+
+    If `forbidden_phrases` (a list of regular expressions) is provided, the legacy
+    text search is used instead, with these expressions.
+
     Returns the list of checked python source files.
     """
-    import os, re
+    import os
+
+    if forbidden_phrases is not None:
+        return _ensure_no_forbidden_phrases(source_root, forbidden_phrases)
+
+    scan_result = scan_forbidden_imports(
+        source_root, cache_path=cache_path, max_workers=max_workers
+    )
+
+    for full_path, lineno, statement in scan_result["findings"]:
+        filename = os.path.basename(full_path)
+        if lineno is None:
+            _ensure_no_forbidden_phrases_in_file(full_path, _LEGACY_FORBIDDEN_PHRASES)
+        elif not _is_allowed_stdlib_warnings_import(filename, statement):
+            raise ValueError(
+                "ALERT, wrong phrase '%s' detected in %s (line %s)"
+                % (statement, full_path, lineno)
+            )
+
+    return [os.path.basename(full_path) for full_path in scan_result["analysed_files"]]
+
+
+def _ensure_no_forbidden_phrases(source_root, forbidden_phrases):
+    import os
 
     analysed_files = []
 
@@ -17,24 +235,75 @@ def ensure_no_stdlib_warnings(
         for f in [x for x in files if x.endswith(".py")]:
             full_path = os.path.join(root, f)
             # print(">> ANALYSING PYTHON FILE", full_path)
-            with open(full_path, "rb") as stream:
-                data = stream.read().decode("utf8", "ignore")
-            for forbidden_phrase in forbidden_phrases:
-                if re.search(forbidden_phrase, data, re.MULTILINE):
-                    if (f == "utilities.py") and (
-                        "import " + "warnings as stdlib_warnings" in data
-                    ):
-                        continue  # the only case OK is our own warnings utility
-                    raise ValueError(
-                        "ALERT, wrong phrase '%s' detected in %s"
-                        % (forbidden_phrase, full_path)
-                    )
+            _ensure_no_forbidden_phrases_in_file(full_path, forbidden_phrases)
             analysed_files.append(f)
     return analysed_files
 
 
+def _ensure_no_forbidden_phrases_in_file(full_path, forbidden_phrases):
+    import os, re
+
+    f = os.path.basename(full_path)
+    with open(full_path, "rb") as stream:
+        data = stream.read().decode("utf8", "ignore")
+    for forbidden_phrase in forbidden_phrases:
+        if re.search(forbidden_phrase, data, re.MULTILINE):
+            if (f == "utilities.py") and (
+                "import " + "warnings as stdlib_warnings" in data
+            ):
+                continue  # the only case OK is our own warnings utility
+            raise ValueError(
+                "ALERT, wrong phrase '%s' detected in %s"
+                % (forbidden_phrase, full_path)
+            )
+
+
+def _get_expected_test_name(fixer):
+    return "test_{}".format(fixer["fixer_callable"].__name__)
+
+
+def get_fixers_without_test(patching_registry, test_names):
+    """Return the list of fixers of the registry, for which no test named
+    "test_<fixer-name>" exists in `test_names` (an iterable of test function names,
+    possibly with a parametrization suffix like "[param-id]")."""
+    test_names_index = set(test_name.partition("[")[0] for test_name in test_names)
+    return [
+        fixer
+        for fixer in patching_registry.get_all_fixers()
+        if _get_expected_test_name(fixer) not in test_names_index
+    ]
+
+
+def _get_missing_fixer_test_item_class():
+    """Build (once) the class of the synthetic pytest items reporting missing tests,
+    since pytest must not be imported along with this module."""
+    global _MissingFixerTestItem
+    if _MissingFixerTestItem is None:
+        import pytest
+
+        class MissingFixerTestItem(pytest.Item):
+            def __init__(self, *, error_message, **kwargs):
+                super(MissingFixerTestItem, self).__init__(**kwargs)
+                self.error_message = error_message
+
+            def runtest(self):
+                raise RuntimeError(self.error_message)
+
+            def repr_failure(self, excinfo, *args, **kwargs):
+                return self.error_message
+
+            def reportinfo(self):
+                return self.path, None, self.name
+
+        _MissingFixerTestItem = MissingFixerTestItem
+    return _MissingFixerTestItem
+
+
+_MissingFixerTestItem = None
+
+
 def ensure_all_fixers_have_a_test_under_pytest(
-    config, items, patching_registry, _fail_fast=False
+    config, items, patching_registry, _fail_fast=False, session=None
 ):
     """Call this pytest hook from a conftest.py to ensure your own test suite covers
     all your registered fixers, like so::
@@ -45,49 +314,61 @@ def ensure_all_fixers_have_a_test_under_pytest(
             ensure_all_fixers_have_a_test_under_pytest(
                 config=config, items=items, patching_registry=your_patching_registry
             )
+
+    Or register a `FixersTestCoveragePlugin` instead, see its documentation.
+
+    For each fixer without test, a failing synthetic test item is appended to
+    `items`. These items are built in a deterministic order, so that all workers of
+    pytest-xdist get the same collection.
     """
-    import copy
-    from _pytest.python import Function
-
-    def generate_missing_fixer_test(_error_message):
-        # We use this closure system, else "error_message" free variable would be wrong in the for loop
-        def missing_fixer_test():
-            raise RuntimeError(_error_message)
-        return missing_fixer_test
-
-    all_fixers = patching_registry.get_all_fixers()
-    all_tests_names = [test.name for test in items]
-    for fixer in all_fixers:
-        expected_test_name = "test_{}".format(fixer["fixer_callable"].__name__)
-        if expected_test_name not in all_tests_names:
-
-            error_message = "No test written for {} fixer '{}'".format(
-                fixer["fixer_family"].title(), fixer["fixer_callable"].__name__
-            )
-            missing_fixer_test = generate_missing_fixer_test(error_message)
-
-            if _fail_fast:  # For testing only
-                missing_fixer_test()
-            mock_item = copy.copy(
-                items[0]
-            )  # We expect at least 1 test in the test suite, else it breaks...
-            mock_item.parent.name = "test_{}_fixers.py".format(fixer["fixer_family"])
-            setattr(
-                mock_item.parent.obj,
-                "MISSING_" + expected_test_name,
-                missing_fixer_test,
+    test_names = [getattr(item, "originalname", None) or item.name for item in items]
+    missing_fixers = get_fixers_without_test(patching_registry, test_names)
+    if not missing_fixers:
+        return
+
+    if session is None and items:
+        session = items[0].session
+
+    for fixer in missing_fixers:
+        expected_test_name = _get_expected_test_name(fixer)
+        error_message = "No test written for {} fixer '{}'".format(
+            fixer["fixer_family"].title(), fixer["fixer_callable"].__name__
+        )
+        if _fail_fast or session is None:  # No session to attach items to
+            raise RuntimeError(error_message)
+        item_name = "MISSING_" + expected_test_name
+        items.append(
+            _get_missing_fixer_test_item_class().from_parent(
+                session,
+                name=item_name,
+                nodeid="test_{}_fixers.py::{}".format(fixer["fixer_family"], item_name),
+                error_message=error_message,
             )
+        )
+
 
-            parent = mock_item.parent
-            params = dict(
-                name="MISSING_" + expected_test_name,
-                #config=config,
-                #session=mock_item.session,
+class FixersTestCoveragePlugin(object):
+    """Pytest plugin ensuring that your own test suite covers all your registered
+    fixers (see `ensure_all_fixers_have_a_test_under_pytest()`).
+
+    Register it from your conftest.py, like so::
+
+        def pytest_configure(config):
+            from yourownpackage.registry import your_patching_registry
+            from compat_patcher_core.scaffolding import FixersTestCoveragePlugin
+            config.pluginmanager.register(
+                FixersTestCoveragePlugin(your_patching_registry),
+                "fixers_test_coverage",
             )
-            # See https://docs.pytest.org/en/stable/deprecations.html#node-construction-changed-to-node-from-parent
-            if hasattr(Function, "from_parent"):
-                function = Function.from_parent(parent, **params)
-            else:
-                function = Function(parent=parent, **params)
+    """
+
+    def __init__(self, patching_registry):
+        self._patching_registry = patching_registry
 
-            items.append(function)
+    def pytest_collection_modifyitems(self, session, config, items):
+        ensure_all_fixers_have_a_test_under_pytest(
+            config=config,
+            items=items,
+            patching_registry=self._patching_registry,
+            session=session,
+        )
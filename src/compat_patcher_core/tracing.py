@@ -0,0 +1,109 @@
+from __future__ import absolute_import, print_function, unicode_literals
+
+import os
+import threading
+import time
+
+
+class _NullSpan(object):
+    """Span doing nothing, shared by all calls of NullTracer.span()."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set_attribute(self, name, value):
+        pass
+
+
+class NullTracer(object):
+    """
+    Default tracer, which records nothing.
+
+    A tracer must provide a `span(name, **attributes)` method, returning a context
+    manager whose value has a `set_attribute(name, value)` method; and an `enabled`
+    boolean, allowing callers to skip the computation of costly attributes.
+    """
+
+    enabled = False
+
+    _null_span = _NullSpan()
+
+    def span(self, name, **attributes):
+        return self._null_span
+
+
+#: Shared instance of the no-op tracer
+NULL_TRACER = NullTracer()
+
+
+class _ChromeTraceSpan(object):
+    def __init__(self, tracer, name, attributes):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self._attributes["exception"] = exc_type.__name__
+        self._tracer._record_event(self._name, self._start, end, self._attributes)
+        return False
+
+    def set_attribute(self, name, value):
+        self._attributes[name] = value
+
+
+class ChromeTraceTracer(object):
+    """
+    Tracer recording spans in memory, and exporting them in the Chrome trace-event
+    JSON format, which can be opened in chrome://tracing or https://ui.perfetto.dev.
+    """
+
+    enabled = True
+
+    def __init__(self, category="compat_patcher"):
+        self._category = category
+        self._origin = time.perf_counter()
+        self._events = []
+        self._lock = threading.Lock()
+
+    def span(self, name, **attributes):
+        return _ChromeTraceSpan(self, name, attributes)
+
+    def _record_event(self, name, start, end, attributes):
+        event = dict(
+            name=name,
+            cat=self._category,
+            ph="X",  # "Complete" event, with a duration
+            ts=(start - self._origin) * 1e6,  # Microseconds
+            dur=(end - start) * 1e6,
+            pid=os.getpid(),
+            tid=threading.current_thread().ident,
+            args=attributes,
+        )
+        with self._lock:
+            self._events.append(event)
+
+    def get_events(self):
+        """Return a copy of the list of recorded trace events, as dicts."""
+        with self._lock:
+            return list(self._events)
+
+    def export(self, output_filename):
+        """Write all recorded spans to a JSON file, in trace-event format."""
+        import json
+
+        with open(output_filename, "w") as f:
+            json.dump(
+                dict(traceEvents=self.get_events(), displayTimeUnit="ms"),
+                f,
+                default=repr,  # Attributes might not all be JSON-serializable
+            )
@@ -1,10 +1,12 @@
 from __future__ import absolute_import, print_function, unicode_literals
 
+import collections
+import contextlib
 import functools
-import importlib
-import logging
 import sys
+import threading
 import types
+import weakref
 import warnings as stdlib_warnings  # Do NOT import/use elsewhere than here!
 
 
@@ -55,6 +57,203 @@ class WarningsProxy(object):
             stdlib_warnings.warn(*args, **kwargs)
 
 
+_MISSING = object()  # Sentinel for attributes absent from an object
+
+
+def _get_own_attribute(target_object, attrname):
+    """Return the attribute directly stored on `target_object` (not inherited from
+    its class or its bases, when possible), or the _MISSING sentinel."""
+    if isinstance(target_object, dict):  # E.g. sys.modules
+        return target_object.get(attrname, _MISSING)
+    try:
+        return vars(target_object).get(attrname, _MISSING)
+    except TypeError:  # No __dict__, e.g. objects with __slots__
+        return getattr(target_object, attrname, _MISSING)
+
+
+InjectionRecord = collections.namedtuple(
+    "InjectionRecord",
+    ["target_object", "target_attrname", "injected_object", "fixer_qualified_name"],
+)
+
+
+def _get_object_name(obj):
+    """Return a short name of the object, for logging purpose."""
+    if obj is sys.modules:
+        return "sys.modules"
+    return getattr(obj, "__name__", None) or repr(obj)
+
+
+def _make_reference(obj, callback=None):
+    """Return a weak reference to `obj`, or a callable keeping a strong reference to it
+    if it doesn't support weak references (e.g. ints, strings, dicts)."""
+    try:
+        return weakref.ref(obj, callback)
+    except TypeError:
+        return lambda: obj
+
+
+class InjectedObjectsRegistry(object):
+    """Central registry of the objects injected by patching utilities, mapping each
+    (target object, attribute name) pair to the injected object and the fixer
+    which injected it.
+
+    Weak references are used when possible, so that this registry doesn't keep alive
+    targets and objects which disappeared; objects which can't be weakly referenced
+    are kept by strong references.
+
+    Unlike the marker attributes set by `patch_injected_objects` setting, this works
+    for all kinds of objects, including bound methods and properties.
+    """
+
+    def __init__(self):
+        # Reentrant lock, since weakref callbacks may fire at any time
+        self._lock = threading.RLock()
+        self._records = {}  # (id(target_object), attrname) -> internal record
+        # Indexes, using dicts as insertion-ordered sets of record keys
+        self._record_keys_by_object_id = collections.defaultdict(dict)
+        self._record_keys_by_fixer = collections.defaultdict(dict)
+
+    def record(
+        self, target_object, target_attrname, injected_object, fixer_qualified_name=None
+    ):
+        """Register an injection, replacing any previous one for the same target
+        object and attribute name."""
+        key = (id(target_object), target_attrname)
+
+        def _discard_if_dead(reference):
+            with self._lock:
+                record = self._records.get(key)
+                if record is None:
+                    pass
+                elif reference is record[0]:  # Target object is gone
+                    self._forget_key(key)
+                elif reference is record[1]:
+                    # Injected object is gone, so it was necessarily overwritten or
+                    # removed: we keep the record for audits, but not its object ID
+                    self._discard_from_index(
+                        self._record_keys_by_object_id, record[3], key
+                    )
+
+        record = (
+            _make_reference(target_object, _discard_if_dead),
+            _make_reference(injected_object, _discard_if_dead),
+            target_attrname,
+            id(injected_object),
+            fixer_qualified_name,
+        )
+        with self._lock:
+            self._forget_key(key)
+            self._records[key] = record
+            self._record_keys_by_object_id[id(injected_object)][key] = None
+            self._record_keys_by_fixer[fixer_qualified_name][key] = None
+
+    def forget(self, target_object, target_attrname):
+        """Unregister the injection done on this target object and attribute name, if
+        any."""
+        with self._lock:
+            self._forget_key((id(target_object), target_attrname))
+
+    def _forget_key(self, key):
+        record = self._records.pop(key, None)
+        if record is None:
+            return
+        self._discard_from_index(self._record_keys_by_object_id, record[3], key)
+        self._discard_from_index(self._record_keys_by_fixer, record[4], key)
+
+    @staticmethod
+    def _discard_from_index(index, index_key, key):
+        keys = index.get(index_key)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del index[index_key]
+
+    def _get_injection_records(self, keys, include_lost_objects=False):
+        injection_records = []
+        for key in keys:
+            target_ref, object_ref, target_attrname, _object_id, fixer = self._records[
+                key
+            ]
+            target_object, injected_object = target_ref(), object_ref()
+            if target_object is None:
+                continue  # Being garbage collected
+            if injected_object is None and not include_lost_objects:
+                continue
+            injection_records.append(
+                InjectionRecord(target_object, target_attrname, injected_object, fixer)
+            )
+        return injection_records
+
+    def is_injected_object(self, obj):
+        """Return True if this exact object was injected somewhere, in O(1)."""
+        with self._lock:
+            keys = self._record_keys_by_object_id.get(id(obj), ())
+            return any(self._records[key][1]() is obj for key in keys)
+
+    def get_injection(self, target_object, target_attrname):
+        """Return the InjectionRecord of this target object and attribute name, or
+        None."""
+        key = (id(target_object), target_attrname)
+        with self._lock:
+            if key not in self._records:
+                return None
+            injection_records = self._get_injection_records([key])
+        if injection_records and injection_records[0].target_object is target_object:
+            return injection_records[0]
+        return None
+
+    def get_injections(self, fixer_qualified_name=None):
+        """Return the list of InjectionRecords of a specific fixer (or those done
+        outside of any fixer, if `fixer_qualified_name` is None)."""
+        with self._lock:
+            keys = self._record_keys_by_fixer.get(fixer_qualified_name, ())
+            return self._get_injection_records(list(keys))
+
+    def get_all_injections(self):
+        """Return the list of all InjectionRecords."""
+        with self._lock:
+            return self._get_injection_records(list(self._records))
+
+    def audit(self):
+        """Check, in a single pass, that all recorded injections are still in place,
+        i.e that other code didn't overwrite or remove the injected attributes.
+
+        Returns a dict with fields "overwritten" and "removed", each being a list of
+        InjectionRecords, as well as "checked_count", the number of checked injections.
+        The `injected_object` field of these records is None if the injected object
+        was garbage collected since then.
+
+        This doesn't trigger descriptors or module-level __getattr__, so it is
+        cheap enough to be run periodically, e.g. from a health-check thread.
+        """
+        overwritten = []
+        removed = []
+        with self._lock:  # Snapshot
+            injection_records = self._get_injection_records(
+                list(self._records), include_lost_objects=True
+            )
+        for injection_record in injection_records:
+            current_value = _get_own_attribute(
+                injection_record.target_object, injection_record.target_attrname
+            )
+            if current_value is _MISSING:
+                removed.append(injection_record)
+            elif current_value is not injection_record.injected_object:
+                overwritten.append(injection_record)
+        return dict(
+            overwritten=overwritten,
+            removed=removed,
+            checked_count=len(injection_records),
+        )
+
+    def clear(self):  # For testing mainly
+        with self._lock:
+            self._records.clear()
+            self._record_keys_by_object_id.clear()
+            self._record_keys_by_fixer.clear()
+
+
 class PatchingUtilities(object):
     """
     An instance of this class is provided as first argument to each compatibility fixer
@@ -71,6 +270,10 @@ class PatchingUtilities(object):
     _logging_level = None
     _enable_warnings = False
     _patch_injected_objects = None
+    _current_fixer_qualified_name = None
+
+    #: Registry shared by all instances, since fixers may be applied in several steps
+    injected_objects_registry = InjectedObjectsRegistry()
 
     settings_keys_used = ["logging_level", "enable_warnings", "patch_injected_objects"]
 
@@ -88,6 +291,8 @@ class PatchingUtilities(object):
         others remaining as is.
         """
         if "logging_level" in settings:
+            import logging  # Deferred, to keep this module cheap to import
+
             assert settings["logging_level"] is None or hasattr(
                 logging, settings["logging_level"]
             ), settings["logging_level"]
@@ -120,14 +325,114 @@ class PatchingUtilities(object):
         have a writable __dict__).
         """
         assert object_to_patch not in (True, False, None), object_to_patch
+        return self._mark_injected_object(object_to_patch)
+
+    def _mark_injected_object(self, object_to_patch):
+        """Same as `_patch_injected_object()`, but without checking the object."""
         if self._patch_injected_objects:
             try:
                 setattr(object_to_patch, self._patch_injected_objects, True)
                 return True
-            except AttributeError:
-                return False  # properties, bound methods and such can't be modified
+            except (AttributeError, TypeError):
+                # properties, bound methods, builtin types and such can't be modified
+                return False
         return None
 
+    def _check_injected_object(self, injected_object):
+        """Check an object like `inject_class()`, `inject_callable()` or
+        `inject_attribute()` would, depending on its kind, and like the marking
+        of injected objects would.
+
+        Classes and simple callables satisfy the checks of `inject_class()` and
+        `inject_callable()`; other objects, including callables like bound methods
+        or `functools.lru_cache()` wrappers, are checked like by `inject_attribute()`,
+        which only rejects None.
+        """
+        assert injected_object not in (True, False, None), injected_object
+
+    @contextlib.contextmanager
+    def _applying_fixer(self, fixer_qualified_name):
+        """Context manager used by the patching runner, so that injections get
+        attributed to the fixer being applied."""
+        previous_fixer_qualified_name = self._current_fixer_qualified_name
+        self._current_fixer_qualified_name = fixer_qualified_name
+        try:
+            yield
+        finally:
+            self._current_fixer_qualified_name = previous_fixer_qualified_name
+
+    def _inject_object(
+        self,
+        target_object,
+        target_attrname,
+        injected_object,
+        fixer_qualified_name=_MISSING,
+        checked=False,
+    ):
+        """Mark the injected object, set it on the target object, and record this
+        injection in the registry of injected objects.
+
+        Returns the result of the marking, like `_patch_injected_object()`.
+
+        If `checked` is True, the injected object was already validated by the caller.
+        """
+        if fixer_qualified_name is _MISSING:
+            fixer_qualified_name = self._current_fixer_qualified_name
+        if checked:
+            patched = self._mark_injected_object(injected_object)
+        else:
+            patched = self._patch_injected_object(injected_object)
+        setattr(target_object, target_attrname, injected_object)
+        self.injected_objects_registry.record(
+            target_object,
+            target_attrname,
+            injected_object,
+            fixer_qualified_name=fixer_qualified_name,
+        )
+        return patched
+
+    def is_injected_object(self, obj):
+        """Return True if this exact object was injected by patching utilities, even if
+        it couldn't be marked with an attribute."""
+        return self.injected_objects_registry.is_injected_object(obj)
+
+    def get_injected_objects(self, fixer_qualified_name):
+        """Return the list of InjectionRecords (namedtuples with fields
+        `target_object`, `target_attrname`, `injected_object` and
+        `fixer_qualified_name`) for the injections done by a fixer."""
+        return self.injected_objects_registry.get_injections(fixer_qualified_name)
+
+    def audit_injections(self):
+        """Check that all objects injected by patching utilities are still in place,
+        and report those which were overwritten or removed by other code (see
+        `InjectedObjectsRegistry.audit()` for the format of the returned dict).
+
+        If some drift is detected, a WARNING log is emitted too.
+        """
+        report = self.injected_objects_registry.audit()
+        for status in ("overwritten", "removed"):
+            for injection_record in report[status]:
+                self.emit_log(
+                    "Injected attribute %r of %s (by fixer %s) was %s"
+                    % (
+                        injection_record.target_attrname,
+                        _get_object_name(injection_record.target_object),
+                        injection_record.fixer_qualified_name,
+                        status,
+                    ),
+                    level="WARNING",
+                )
+        return report
+
+    def _is_logging_enabled(self, level):
+        """Return True if messages of this level are output by `emit_log()`."""
+        min_logging_level = self._logging_level
+        if min_logging_level is None:
+            return False  # No logging at all
+        import logging
+
+        return getattr(logging, level) >= getattr(logging, min_logging_level)
+
     def emit_log(self, message, level="INFO"):
         """A logger printing to stderr, since at some stages of patching, logging is
         not yet setup.
@@ -135,10 +440,7 @@ class PatchingUtilities(object):
         Log is only output if `level` is gerater or equal the current `logging_level`
         setting.
         """
-        min_logging_level = self._logging_level
-        if min_logging_level is None:
-            return  # No logging at all
-        if getattr(logging, level) < getattr(logging, min_logging_level):
+        if not self._is_logging_enabled(level):
             return
         full_message = "[DCP_%s] %s" % (level, message)
         print(full_message, file=sys.stderr)
@@ -161,8 +463,56 @@ class PatchingUtilities(object):
         assert not self._is_simple_callable(attribute), attribute
         assert not isinstance(attribute, type), attribute
 
-        self._patch_injected_object(attribute)
-        setattr(target_object, target_attrname, attribute)
+        self._inject_object(target_object, target_attrname, attribute)
+
+    def inject_lazy_attribute(self, target_object, target_attrname, factory):
+        """Inject an attribute into a module or a class, but only build it (by
+        calling `factory()`) the first time it is accessed.
+
+        For modules, a module-level `__getattr__` (PEP 562) is installed, or chained
+        onto the existing one. For classes, a descriptor is installed.
+        In both cases, the built object is then cached on the target object, and
+        marked like other injected objects.
+
+        Note that in case of concurrent first accesses, the factory might be called
+        more than once.
+
+        :param target_object: The module or class to patch
+        :param target_attrname: The name given to the new attribute in the object to patch
+        :param factory: The callable, without arguments, returning the attribute to inject
+        """
+        assert callable(factory), factory
+        fixer_qualified_name = self._current_fixer_qualified_name
+
+        def _build_attribute():
+            attribute = factory()
+            self._inject_object(  # Replaces the lazy hook
+                target_object,
+                target_attrname,
+                attribute,
+                fixer_qualified_name=fixer_qualified_name,
+            )
+            return attribute
+
+        if isinstance(target_object, types.ModuleType):
+            module_getattr = target_object.__dict__.get("__getattr__")
+            lazy_factories = getattr(module_getattr, "_compat_lazy_factories", None)
+            if lazy_factories is None:
+                lazy_factories = {}
+                module_getattr = _make_lazy_module_getattr(
+                    target_object, lazy_factories, previous_getattr=module_getattr
+                )
+                target_object.__getattr__ = module_getattr
+            # Module-level __getattr__ is only called for MISSING attributes
+            target_object.__dict__.pop(target_attrname, None)
+            lazy_factories[target_attrname] = _build_attribute
+        else:
+            assert isinstance(target_object, type), target_object
+            setattr(
+                target_object,
+                target_attrname,
+                _LazyAttributeDescriptor(_build_attribute),
+            )
 
     def inject_callable(self, target_object, target_callable_name, patch_callable):
         """Inject a simple callable (not a class) into an object of any type (module, class, instance...).
@@ -173,8 +523,7 @@ class PatchingUtilities(object):
         """
         assert self._is_simple_callable(patch_callable), patch_callable
 
-        self._patch_injected_object(patch_callable)
-        setattr(target_object, target_callable_name, patch_callable)
+        self._inject_object(target_object, target_callable_name, patch_callable)
 
     def inject_callable_alias(
         self, target_object, target_attrname, source_object, source_attrname
@@ -203,11 +552,81 @@ class PatchingUtilities(object):
             )
             return source_callable(*args, **kwds)
 
-        self._patch_injected_object(wrapper)
-        setattr(target_object, target_attrname, wrapper)
+        self._inject_object(target_object, target_attrname, wrapper)
 
         return wrapper
 
+    def inject_method_alias(self, target_klass, target_attrname, source_attrname):
+        """
+        Create and inject into a class an alias for one of its methods (be it a
+        standard method, a classmethod or a staticmethod), which also triggers a
+        deprecation warning when accessed.
+
+        The alias is a descriptor delegating to the source attribute at each access,
+        so that it uses the standard (fast) method binding, and respects overrides of
+        the source method in subclasses.
+
+        Returns the created alias descriptor, whose `usage_count` attribute tracks
+        the number of accesses. Beware, like warnings, these are counted at each
+        attribute lookup of the alias (including via `hasattr()` or introspection
+        tools), not only when the method actually gets called.
+
+        :param target_klass: The class to patch
+        :param target_attrname: The name of the alias on the target class
+        :param source_attrname: The name of the aliased method on the target class
+        """
+        source_method = _get_static_class_attribute(target_klass, source_attrname)
+        assert isinstance(
+            source_method, (types.FunctionType, classmethod, staticmethod)
+        ), source_method
+
+        alias = _MethodAliasDescriptor(
+            self,
+            source_attrname=source_attrname,
+            message="%s.%s, which is an alias for %s.%s, was accessed. "
+            "One of these is deprecated."
+            % (
+                target_klass.__name__,
+                target_attrname,
+                target_klass.__name__,
+                source_attrname,
+            ),
+        )
+        self._inject_object(target_klass, target_attrname, alias)
+
+        return alias
+
+    def inject_property_alias(self, target_klass, target_attrname, source_attrname):
+        """
+        Create and inject into a class an alias for one of its properties, which also
+        triggers a deprecation warning when accessed (for reading, writing or deleting).
+
+        Returns the created alias descriptor, whose `usage_count` attribute tracks
+        the number of accesses.
+
+        :param target_klass: The class to patch
+        :param target_attrname: The name of the alias on the target class
+        :param source_attrname: The name of the aliased property on the target class
+        """
+        source_property = _get_static_class_attribute(target_klass, source_attrname)
+        assert isinstance(source_property, property), source_property
+
+        alias = _PropertyAliasDescriptor(
+            self,
+            source_attrname=source_attrname,
+            message="%s.%s, which is an alias for %s.%s, was accessed. "
+            "One of these is deprecated."
+            % (
+                target_klass.__name__,
+                target_attrname,
+                target_klass.__name__,
+                source_attrname,
+            ),
+        )
+        self._inject_object(target_klass, target_attrname, alias)
+
+        return alias
+
     def inject_class(self, target_object, target_klassname, klass):
         """Inject a class into an object of any type (module, class, instance...).
 
@@ -217,8 +636,92 @@ class PatchingUtilities(object):
         """
         assert isinstance(klass, type), klass
 
-        self._patch_injected_object(klass)
-        setattr(target_object, target_klassname, klass)
+        self._inject_object(target_object, target_klassname, klass)
+
+    def inject_many(self, target_object, injected_objects, atomic=False):
+        """Inject a batch of attributes, callables and/or classes into an object of
+        any type (module, class, instance...).
+
+        See `inject_many_into_targets()` for details, this method handles a single
+        target object.
+
+        :param target_object: The object to patch
+        :param injected_objects: A dict mapping names in the target object to the objects to inject
+        :param atomic: If True, all injections are rolled back if one of them fails
+        """
+        return self.inject_many_into_targets(
+            [(target_object, injected_objects)], atomic=atomic
+        )[0]
+
+    def inject_many_into_targets(self, injections, atomic=False):
+        """Inject batches of attributes, callables and/or classes into several objects.
+
+        All injections are validated before any of them is applied, each object
+        being checked like `inject_class()`, `inject_callable()` or
+        `inject_attribute()` would, depending on its kind (other callables than
+        classes and simple callables are injected as attributes). Then, if `atomic` is True and an injection fails,
+        previously applied injections of this call are rolled back, and the exception
+        is re-raised; else, the failure is logged and other injections go on.
+
+        Returns a list (in the same order as `injections`) of dicts, each mapping
+        injected names to the result of the marking of the injected object: True if
+        it was marked, False if it couldn't be marked (e.g. builtin functions or
+        types), and None if marking is disabled by settings; or, in non-atomic mode,
+        to the exception raised if the injection failed.
+
+        :param injections: A list of (target_object, injected_objects) pairs, with injected_objects being a dict mapping names to objects
+        :param atomic: If True, all injections are rolled back if one of them fails
+        """
+        injections = list(injections)
+        for target_object, injected_objects in injections:
+            assert target_object is not None, target_object
+            for target_attrname, injected_object in injected_objects.items():
+                assert target_attrname and isinstance(
+                    target_attrname, str
+                ), target_attrname
+                self._check_injected_object(injected_object)
+
+        applied_injections = []  # For rollback, with previous values
+        outcomes = []
+        try:
+            for target_object, injected_objects in injections:
+                outcome = {}
+                for target_attrname, injected_object in injected_objects.items():
+                    try:
+                        previous_value = _get_own_attribute(
+                            target_object, target_attrname
+                        )
+                        outcome[target_attrname] = self._inject_object(
+                            target_object,
+                            target_attrname,
+                            injected_object,
+                            checked=True,
+                        )
+                    except Exception as exc:
+                        if atomic:
+                            raise  # Rolled back below
+                        self.emit_log(
+                            "Injection of attribute %r into %s failed: %r"
+                            % (target_attrname, _get_object_name(target_object), exc),
+                            level="WARNING",
+                        )
+                        outcome[target_attrname] = exc
+                        continue
+                    applied_injections.append(
+                        (target_object, target_attrname, previous_value)
+                    )
+                outcomes.append(outcome)
+        except Exception:
+            for target_object, target_attrname, previous_value in reversed(
+                applied_injections
+            ):
+                if previous_value is _MISSING:
+                    delattr(target_object, target_attrname)
+                else:
+                    setattr(target_object, target_attrname, previous_value)
+                self.injected_objects_registry.forget(target_object, target_attrname)
+            raise
+        return outcomes
 
     def inject_module(self, target_module_name, module):
         """Inject a module in sys.modules, under the selected dotted name.
@@ -239,8 +742,37 @@ class PatchingUtilities(object):
         self._patch_injected_object(module)
 
         sys.modules[target_module_name] = module
+        self.injected_objects_registry.record(
+            sys.modules,
+            target_module_name,
+            module,
+            fixer_qualified_name=self._current_fixer_qualified_name,
+        )
 
-    def inject_import_alias(self, alias_name, real_name):
+    def inject_moved_symbol(
+        self, old_module_name, old_name, new_module_name, new_name=None
+    ):
+        """Make a symbol (class, function, constant...), which moved to another module,
+        importable from its old module too.
+
+        The new module is only imported when the symbol is first accessed via the
+        old module (e.g. "from old_module import old_name").
+
+        :param old_module_name: The dotted name of the old module, which must exist
+        :param old_name: The name of the symbol in the old module
+        :param new_module_name: The dotted name of the new module
+        :param new_name: The name of the symbol in the new module, if it was renamed
+        """
+        from compat_patcher_core import import_proxifier
+
+        import_proxifier.register_moved_symbol(
+            old_module_name=old_module_name,
+            old_name=old_name,
+            new_module_name=new_module_name,
+            new_name=new_name,
+        )
+
+    def inject_import_alias(self, alias_name, real_name, lazy=False):
         """Create an import alias for the selected module.
 
         This doesn't directly patch sys.modules, but instead uses the imports hooks
@@ -251,21 +783,120 @@ class PatchingUtilities(object):
 
         :param alias_name: The dotted name of the alias module
         :param real_name: The dotted name of the real module
+        :param lazy: If True, the real module is only loaded on first attribute access
         """
 
         from compat_patcher_core import import_proxifier
 
         import_proxifier.install_import_proxifier()  # idempotent activation
         import_proxifier.register_module_alias(
-            alias_name=alias_name, real_name=real_name
+            alias_name=alias_name, real_name=real_name, lazy=lazy
         )
 
 
+def _make_lazy_module_getattr(module, lazy_factories, previous_getattr=None):
+    """Build a PEP 562 module-level __getattr__, which resolves lazy attributes
+    registered in `lazy_factories`, and else delegates to `previous_getattr` if any.
+    """
+
+    def __getattr__(name):
+        build_attribute = lazy_factories.get(name)
+        if build_attribute is not None:
+            attribute = build_attribute()
+            lazy_factories.pop(name, None)
+            return attribute
+        if previous_getattr is not None:
+            return previous_getattr(name)
+        raise AttributeError(
+            "module %r has no attribute %r" % (module.__name__, name)
+        )
+
+    __getattr__._compat_lazy_factories = lazy_factories
+    return __getattr__
+
+
+class _LazyAttributeDescriptor(object):
+    """Non-data descriptor which builds a lazy class attribute on first access, the
+    builder being in charge of replacing this descriptor on the class.
+    """
+
+    def __init__(self, build_attribute):
+        self._build_attribute = build_attribute
+
+    def __get__(self, instance, owner=None):
+        attribute = self._build_attribute()
+        # Behave like a normal lookup, at class level too (e.g. for classmethods)
+        descriptor_get = getattr(type(attribute), "__get__", None)
+        if descriptor_get is not None:
+            if owner is None:
+                owner = type(instance)
+            return descriptor_get(attribute, instance, owner)
+        return attribute
+
+
+def _get_static_class_attribute(klass, attrname):
+    """Return the raw attribute (without calling the descriptor protocol) found in
+    the class or its bases, or raise AttributeError."""
+    assert isinstance(klass, type), klass
+    for base in klass.__mro__:
+        if attrname in base.__dict__:
+            return base.__dict__[attrname]
+    raise AttributeError(
+        "type object %r has no attribute %r" % (klass.__name__, attrname)
+    )
+
+
+class _MethodAliasDescriptor(object):
+    """Non-data descriptor which redirects attribute lookups to another attribute,
+    emitting a warning at each access."""
+
+    def __init__(self, patching_utilities, source_attrname, message):
+        self._patching_utilities = patching_utilities
+        self._source_attrname = source_attrname
+        self._message = message
+        self.usage_count = 0
+
+    def _notify_access(self):
+        """Hook shared by all kinds of aliases, called at each access."""
+        self.usage_count += 1
+        # Stacklevel points to the code accessing the alias
+        self._patching_utilities.emit_warning(
+            self._message, category=DeprecationWarning, stacklevel=3
+        )
+
+    def __get__(self, instance, owner=None):
+        self._notify_access()
+        if instance is None:
+            return getattr(owner, self._source_attrname)
+        return getattr(instance, self._source_attrname)
+
+
+class _PropertyAliasDescriptor(_MethodAliasDescriptor):
+    """Data descriptor which redirects attribute reads, writes and deletions to
+    another attribute, emitting a warning at each access."""
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self  # Like properties, when accessed on the class
+        self._notify_access()
+        return getattr(instance, self._source_attrname)
+
+    def __set__(self, instance, value):
+        self._notify_access()
+        setattr(instance, self._source_attrname, value)
+
+    def __delete__(self, instance):
+        self._notify_access()
+        delattr(instance, self._source_attrname)
+
+
 def _import_attribute_from_dotted_string(dotted_string):
     """Turns `mymodule.mysubmodule.my_attr` into the imported my_attr
     object, be it a class or an instance.
     """
     module_name, attr_name = dotted_string.rsplit(".", 1)
+    import importlib
+
     module = importlib.import_module(module_name)
     attribute = getattr(module, attr_name)
     return attribute
@@ -56,6 +56,7 @@ def fix_something_upto_v6(utils):
 def fix_something_always(utils):
     "Does something always"
     dummy_module.APPLIED_FIXERS.append(fix_something_always.__name__)
+    utils.inject_attribute(dummy_module, "fix_something_always_marker", object())
 
 
 @patching_registry.register_compatibility_fixer(fixer_reference_version="5.0")
@@ -0,0 +1,93 @@
+from __future__ import absolute_import, print_function, unicode_literals
+
+import json
+
+import pytest
+
+from compat_patcher_core.cli import main, _get_percentiles
+
+
+def test_cli_plan(capsys):
+    main(["plan", "dummy_fixers.patching_registry", "--json"])
+    plan = json.loads(capsys.readouterr().out.split("###\n")[-1])
+    assert plan["selected"][0] == "dummy5.0|fix_something_upto_v6"
+    assert len(plan["selected"]) == 5
+    assert dict(
+        fixer_id="fix_something_from_v6", reason="useful only in next software versions"
+    ) in plan["skipped"]
+
+    main(
+        [
+            "plan",
+            "dummy_fixers.patching_registry",
+            "--software-version",
+            "1.0",
+            "--exclude-fixer-families",
+            "*",
+        ]
+    )
+    output = capsys.readouterr().out
+    assert "Selected fixers, in order of application (0)" in output
+
+    with pytest.raises(ValueError, match="Wrong registry reference"):
+        main(["plan", "dummy_fixers.PACKAGE_DIR"])
+
+
+def test_cli_profile_and_bench(capsys):
+    main(["profile", "dummy_fixers.patching_registry"])
+    output = capsys.readouterr().out
+    assert "Registry import:" in output
+    assert "applied          dummy5.0|fix_something_always" in output
+    assert "skipped          dummy5.0|fix_something_but_skipped" in output
+
+    main(["profile", "dummy_fixers.patching_registry_ter_as_callable"])
+    output = capsys.readouterr().out  # Registry state is only altered in subprocess
+    assert "applied          somefamily8.3|fix_everything" in output
+
+    main(["bench", "dummy_fixers.patching_registry", "--repeat", "5"])
+    output = capsys.readouterr().out
+    assert "selection  (5 runs): min=" in output
+    assert "patching   (5 runs): min=" in output
+
+
+def test_cli_software_version_override(capsys):
+    from dummy_fixers import patching_registry
+
+    main(
+        [
+            "plan",
+            "dummy_fixers.patching_registry",
+            "--software-version",
+            "1.0",
+            "--json",
+        ]
+    )
+    plan = json.loads(capsys.readouterr().out.split("###\n")[-1])
+    assert len(plan["selected"]) == 2
+
+    main(["profile", "dummy_fixers.patching_registry", "--software-version", "1.0"])
+    output = capsys.readouterr().out
+    applied_fixers = [
+        line.split()[-1] for line in output.splitlines() if " applied " in line
+    ]
+    assert applied_fixers and set(applied_fixers) <= set(plan["selected"])
+    assert "dummy5.0|fix_something_from_v5" not in output
+
+    current_software_version = patching_registry._current_software_version
+    main(
+        [
+            "bench",
+            "dummy_fixers.patching_registry",
+            "--software-version",
+            "1.0",
+            "--repeat",
+            "2",
+        ]
+    )
+    assert "patching   (2 runs)" in capsys.readouterr().out
+    assert patching_registry._current_software_version is current_software_version
+
+
+def test_get_percentiles():
+    percentiles = _get_percentiles([i / 1000 for i in range(100, 0, -1)])
+    assert percentiles == dict(min=1, p50=50, p90=90, p99=99, max=100)
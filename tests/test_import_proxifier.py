@@ -1,5 +1,7 @@
 import sys, urllib
 
+import pytest
+
 from compat_patcher_core.import_proxifier import (
     install_import_proxifier,
     register_module_alias,
@@ -95,3 +97,388 @@ def test_import_proxifier():
     # Re-overridden by our own importer on python3 only
     assert my_urllib_parse_alias.__name__ == "urllib.parse"
     assert my_urllib_parse_alias.urlencode(dict(name="h\xc3llo")) == "name=h%C3%83llo"
+
+
+def test_module_alias_real_name_lookup():
+    from compat_patcher_core.import_proxifier import _get_module_alias_real_name
+
+    assert register_module_alias("lookupalias", real_name="json")
+    assert not register_module_alias("lookupalias", real_name="json")
+    assert not register_module_alias("lookupalias", real_name="csv")  # First one wins
+    assert register_module_alias("lookupalias.sub.lookupalias", real_name="csv")
+
+    assert _get_module_alias_real_name("lookupalias") == "json"
+    assert _get_module_alias_real_name("lookupalias.tool") == "json.tool"
+    # Only the prefix is replaced
+    assert (
+        _get_module_alias_real_name("lookupalias.lookupalias_sub")
+        == "json.lookupalias_sub"
+    )
+    # Longest alias wins
+    assert _get_module_alias_real_name("lookupalias.sub.lookupalias.x") == "csv.x"
+    assert _get_module_alias_real_name("lookupalias.sub.other") == "json.sub.other"
+    assert _get_module_alias_real_name("lookupaliasbis") is None
+    assert _get_module_alias_real_name("other.lookupalias") is None
+
+
+def test_install_import_proxifier_after_builtin_finders():
+    import importlib.machinery
+
+    from compat_patcher_core.import_proxifier import ModuleAliasFinder
+
+    original_meta_path = sys.meta_path[:]
+    try:
+        if ModuleAliasFinder in sys.meta_path:
+            sys.meta_path.remove(ModuleAliasFinder)
+        install_import_proxifier(after_builtin_finders=True)
+        position = sys.meta_path.index(ModuleAliasFinder)
+        assert position > sys.meta_path.index(importlib.machinery.BuiltinImporter)
+        assert position > sys.meta_path.index(importlib.machinery.FrozenImporter)
+        install_import_proxifier()  # idempotent, position unchanged
+        assert sys.meta_path.index(ModuleAliasFinder) == position
+
+        register_module_alias("mybuiltinalias", real_name="json")
+        import mybuiltinalias
+        import json
+
+        assert mybuiltinalias is json
+    finally:
+        sys.meta_path[:] = original_meta_path
+
+
+def test_find_spec_fast_negative_path():
+    from compat_patcher_core.import_proxifier import ModuleAliasFinder
+
+    register_module_alias("fastpathalias.sub", real_name="json")
+    # Must be imported afterwards, since this frozenset is replaced on registration
+    from compat_patcher_core.import_proxifier import _ALIASED_TOP_LEVEL_NAMES
+
+    assert "fastpathalias" in _ALIASED_TOP_LEVEL_NAMES
+    assert ModuleAliasFinder.find_spec("fastpathalias_unrelated") is None
+    assert ModuleAliasFinder.find_spec("fastpathalias.other") is None
+    assert ModuleAliasFinder.find_spec("fastpathalias.sub").name == "fastpathalias.sub"
+
+
+def test_find_spec_caching():
+    from compat_patcher_core.import_proxifier import ModuleAliasFinder
+
+    install_import_proxifier()
+    register_module_alias("cachedspecalias", real_name="json")
+
+    spec = ModuleAliasFinder.find_spec("cachedspecalias.decoder")
+    assert spec.loader.real_name == "json.decoder"
+    assert ModuleAliasFinder.find_spec("cachedspecalias.decoder") is spec  # Reused
+    assert ModuleAliasFinder.find_spec("cachedspecalias_unrelated") is None
+
+    register_module_alias("cachedspecalias.decoder", real_name="csv")  # Invalidates
+    new_spec = ModuleAliasFinder.find_spec("cachedspecalias.decoder")
+    assert new_spec is not spec
+    assert new_spec.loader.real_name == "csv"
+
+    import cachedspecalias.decoder
+    import csv
+
+    assert cachedspecalias.decoder is csv
+    csv_spec = cachedspecalias.decoder.__spec__.loader_state["aliased_spec"]
+    assert csv_spec.name == "csv"
+    del sys.modules["cachedspecalias.decoder"]
+    import cachedspecalias.decoder  # Cached spec is reused for a new import
+
+    assert cachedspecalias.decoder is csv
+    alias_spec = cachedspecalias.decoder.__spec__
+    assert alias_spec is new_spec
+    assert alias_spec.loader_state["aliased_spec"] is csv_spec  # No self-reference
+
+
+def test_lazy_module_alias(tmp_path, monkeypatch):
+    import importlib
+
+    package_dir = tmp_path / "heavy_real_pkg"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text(
+        "from . import helpers\nVALUE = helpers.compute()\n"
+    )
+    (package_dir / "helpers.py").write_text("def compute():\n    return 42\n")
+    (package_dir / "heavy_sub.py").write_text("OTHER_VALUE = 43\n")
+    (tmp_path / "heavy_real_module.py").write_text("MODULE_VALUE = 44\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    install_import_proxifier()
+    register_module_alias("lazy_heavy_alias", real_name="heavy_real_pkg", lazy=True)
+    register_module_alias(
+        "lazy_heavy_module_alias", real_name="heavy_real_module", lazy=True
+    )
+
+    import lazy_heavy_alias
+
+    assert "VALUE" not in vars(lazy_heavy_alias)  # Not executed yet
+    assert "heavy_real_pkg.helpers" not in sys.modules
+    assert sys.modules["heavy_real_pkg"] is lazy_heavy_alias  # Singleton
+
+    import heavy_real_pkg
+
+    assert heavy_real_pkg is lazy_heavy_alias
+    assert "VALUE" not in vars(heavy_real_pkg)
+
+    assert lazy_heavy_alias.VALUE == 42  # Triggers loading, with relative imports
+    assert heavy_real_pkg.helpers.compute() == 42
+    assert type(lazy_heavy_alias) is type(sys)
+    assert lazy_heavy_alias.__name__ == "heavy_real_pkg"
+    assert lazy_heavy_alias.__spec__.origin == "alias"
+
+    from lazy_heavy_alias import heavy_sub  # Submodules are lazy too
+
+    assert heavy_sub is importlib.import_module("heavy_real_pkg.heavy_sub")
+    assert heavy_sub.OTHER_VALUE == 43
+
+    import lazy_heavy_module_alias  # Non-package modules are supported
+
+    assert "MODULE_VALUE" not in vars(lazy_heavy_module_alias)
+    assert lazy_heavy_module_alias.MODULE_VALUE == 44
+    with pytest.raises(AttributeError):
+        lazy_heavy_module_alias.unexisting_attribute
+
+    (tmp_path / "heavy_reimported_module.py").write_text("REIMPORTED_VALUE = 45\n")
+    register_module_alias(
+        "lazy_reimported_alias", real_name="heavy_reimported_module", lazy=True
+    )
+    import lazy_reimported_alias
+
+    del sys.modules["lazy_reimported_alias"]
+    import lazy_reimported_alias  # Real module is still waiting for its execution
+
+    assert "REIMPORTED_VALUE" not in vars(lazy_reimported_alias)
+    assert lazy_reimported_alias.REIMPORTED_VALUE == 45
+    assert sys.modules["heavy_reimported_module"] is lazy_reimported_alias
+
+    (tmp_path / "heavy_slow_module.py").write_text(
+        "import time\nFIRST_VALUE = 1\ntime.sleep(0.2)\nSLOW_VALUE = 46\n"
+    )
+    register_module_alias("lazy_slow_alias", real_name="heavy_slow_module", lazy=True)
+    import threading, time
+    import lazy_slow_alias
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(lazy_slow_alias.SLOW_VALUE))
+    thread.start()
+    time.sleep(0.05)  # Module is being executed by the other thread
+    assert lazy_slow_alias.SLOW_VALUE == 46  # Waits for the end of execution
+    thread.join()
+    assert results == [46]
+
+    (tmp_path / "heavy_failing_module.py").write_text(
+        "raise ValueError('broken module')\nFAILING_VALUE = 47\n"
+    )
+    register_module_alias(
+        "lazy_failing_alias", real_name="heavy_failing_module", lazy=True
+    )
+    import lazy_failing_alias
+
+    for _ in range(2):  # Import error is raised again, not an AttributeError
+        with pytest.raises(ValueError, match="broken module"):
+            lazy_failing_alias.FAILING_VALUE
+
+    register_module_alias("lazy_stdlib_alias", real_name="json", lazy=True)
+    import lazy_stdlib_alias  # Real module already imported, so no laziness needed
+    import json
+
+    assert lazy_stdlib_alias is json
+
+    register_module_alias("lazy_missing_alias", real_name="lazy_missing", lazy=True)
+    with pytest.raises(ImportError, match="lazy_missing_alias"):
+        import lazy_missing_alias
+
+
+def test_bulk_registration_and_unregistration():
+    from compat_patcher_core.import_proxifier import (
+        register_module_aliases,
+        unregister_module_alias,
+        unregister_module_aliases,
+        _get_module_alias_real_name,
+        MODULES_ALIASES_REGISTRY,
+    )
+
+    install_import_proxifier()
+
+    registered = register_module_aliases(
+        {"bulkalias": "json", "bulkalias2": "csv", "bulkalias3.sub": "json.decoder"}
+    )
+    assert registered == ["bulkalias", "bulkalias2", "bulkalias3.sub"]
+    assert register_module_aliases({"bulkalias": "json"}) == []  # Already known
+
+    for aliases in (
+        {"bulkloop1": "bulkloop2", "bulkloop2": "bulkloop1"},
+        {"bulkloop1": "bulkloop1.sub"},
+        {"bulkloop1": "bulkalias3.other", "bulkalias3": "bulkloop1.sub"},
+        {"bulkloop1": "bulkalias.tool", "json": "bulkloop1.x"},  # Loops over prefixes
+    ):
+        with pytest.raises(ValueError, match="infinite import loop"):
+            register_module_aliases(aliases)
+        assert "bulkloop1" not in MODULES_ALIASES_REGISTRY  # Nothing registered
+
+    import bulkalias
+    import bulkalias.decoder
+    import json
+
+    assert bulkalias is json
+
+    assert unregister_module_aliases(["bulkalias", "bulkalias3.sub", "unknown"]) == [
+        "bulkalias",
+        "bulkalias3.sub",
+    ]
+    assert _get_module_alias_real_name("bulkalias.decoder") is None
+    assert _get_module_alias_real_name("bulkalias3.sub") is None
+    assert _get_module_alias_real_name("bulkalias2") == "csv"
+    assert sys.modules["bulkalias"] is json  # Not purged
+
+    assert unregister_module_alias("bulkalias2", purge_modules=True) is True
+    assert unregister_module_alias("bulkalias2", purge_modules=True) is False
+
+    register_module_alias("bulkalias", real_name="json")
+    unregister_module_alias("bulkalias", purge_modules=True)
+    assert "bulkalias" not in sys.modules
+    assert "bulkalias.decoder" not in sys.modules
+    assert "json.decoder" in sys.modules
+    with pytest.raises(ImportError):
+        import bulkalias
+
+    # The alias parent module comes after its submodule in sys.modules
+    register_module_alias("bulkalias", real_name="json")
+    import bulkalias.decoder
+
+    sys.modules["bulkalias"] = sys.modules.pop("bulkalias")
+    unregister_module_alias("bulkalias", purge_modules=True)
+    assert "bulkalias.decoder" not in sys.modules
+    assert json.decoder is sys.modules["json.decoder"]  # Real package untouched
+
+    from compat_patcher_core import import_proxifier
+
+    assert "bulkalias" not in import_proxifier._ALIASED_TOP_LEVEL_NAMES
+    assert "bulkalias3" not in import_proxifier._ALIASED_TOP_LEVEL_NAMES
+
+
+def test_moved_symbols(tmp_path, monkeypatch):
+    from compat_patcher_core.import_proxifier import (
+        register_moved_symbol,
+        register_moved_symbols,
+    )
+
+    (tmp_path / "symbols_old_module.py").write_text(
+        "KEPT = 1\n\ndef __getattr__(name):\n"
+        "    if name == 'DYNAMIC':\n        return 2\n    raise AttributeError(name)\n"
+    )
+    (tmp_path / "symbols_new_module.py").write_text(
+        "class MovedClass:\n    pass\n\nRENAMED_CONSTANT = 3\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    assert register_moved_symbol(
+        "symbols_old_module", "MovedClass", "symbols_new_module"
+    )
+    assert not register_moved_symbol(
+        "symbols_old_module", "MovedClass", "symbols_new_module"
+    )
+    assert register_moved_symbols(
+        {
+            ("symbols_old_module", "OLD_CONSTANT"): (
+                "symbols_new_module",
+                "RENAMED_CONSTANT",
+            ),
+        }
+    ) == [("symbols_old_module", "OLD_CONSTANT")]
+
+    import symbols_old_module
+
+    assert "symbols_new_module" not in sys.modules  # Not imported yet
+
+    from symbols_old_module import MovedClass, OLD_CONSTANT
+    import symbols_new_module
+
+    assert MovedClass is symbols_new_module.MovedClass
+    assert OLD_CONSTANT == 3
+    assert vars(symbols_old_module)["MovedClass"] is MovedClass  # Cached
+    assert symbols_old_module.KEPT == 1
+    assert symbols_old_module.DYNAMIC == 2  # Previous __getattr__ is still used
+    with pytest.raises(AttributeError):
+        symbols_old_module.UNEXISTING
+
+
+def test_alias_hits_instrumentation():
+    from compat_patcher_core.import_proxifier import (
+        ModuleAliasFinder,
+        get_alias_hits_snapshot,
+        reset_alias_hits,
+        set_alias_hits_reporter,
+    )
+    from compat_patcher_core.utilities import PatchingUtilities, stdlib_warnings
+
+    install_import_proxifier()
+    reset_alias_hits()
+    register_module_alias("instrumentedalias", real_name="json")
+    ModuleAliasFinder.find_spec("json_unrelated")
+    assert get_alias_hits_snapshot() == {}  # Non-aliased lookups are not counted
+
+    patching_utilities = PatchingUtilities(
+        dict(logging_level=None, enable_warnings=True, patch_injected_objects=True)
+    )
+    set_alias_hits_reporter(patching_utilities)
+    try:
+        with stdlib_warnings.catch_warnings(record=True) as w:
+            stdlib_warnings.simplefilter("always", Warning)
+            import instrumentedalias
+
+            ModuleAliasFinder.find_spec("instrumentedalias")
+            ModuleAliasFinder.find_spec("instrumentedalias")
+    finally:
+        set_alias_hits_reporter(None)
+
+    assert len(w) == 1  # Warned only once
+    assert "'json' was imported via its alias 'instrumentedalias'" in str(w[0].message)
+
+    snapshot = get_alias_hits_snapshot()
+    assert list(snapshot) == ["instrumentedalias"]
+    alias_hits = snapshot["instrumentedalias"]
+    assert alias_hits["real_name"] == "json"
+    assert alias_hits["hits"] == 3
+    assert "test_alias_hits_instrumentation" in "".join(alias_hits["first_hit_stack"])
+    assert alias_hits["create_module_seconds"] > 0
+
+    alias_hits["first_hit_stack"].clear()  # Snapshot is a copy
+    assert get_alias_hits_snapshot()["instrumentedalias"]["first_hit_stack"]
+
+
+def test_preload_aliased_submodules():
+    from compat_patcher_core.import_proxifier import preload_aliased_submodules
+
+    install_import_proxifier()
+    register_module_alias("preloadedalias", real_name="email")
+    register_module_alias("preloadedalias.mime.text", real_name="email.mime.image")
+
+    preloaded_alias_names = preload_aliased_submodules(
+        "preloadedalias", submodule_names=["mime.multipart", "headerregistry"]
+    )
+    import email
+    import email.mime.multipart
+
+    assert sys.modules["preloadedalias"] is email
+    assert "preloadedalias.mime.multipart" in preloaded_alias_names
+    assert "preloadedalias.headerregistry" in preloaded_alias_names
+    assert "preloadedalias.mime.text" not in preloaded_alias_names  # Other alias
+    assert sys.modules["preloadedalias.mime.multipart"] is email.mime.multipart
+
+    spec = email.mime.multipart.__spec__
+    assert spec.origin == "alias"
+    assert spec.name == "preloadedalias.mime.multipart"
+    assert spec.loader_state["aliased_spec"].name == "email.mime.multipart"
+
+    from preloadedalias.mime import multipart
+
+    assert multipart is email.mime.multipart
+    assert preload_aliased_submodules("preloadedalias") == []  # Already done
+
+    sys.modules["email.blocked_submodule"] = None  # Standard way to block an import
+    try:
+        assert preload_aliased_submodules("preloadedalias") == []
+        assert "preloadedalias.blocked_submodule" not in sys.modules
+    finally:
+        del sys.modules["email.blocked_submodule"]
@@ -335,3 +335,113 @@ def test_multi_patching_registry():
 
     with pytest.raises(ValueError, match="unpack"):
         MultiPatchingRegistry(registries=["badstring"])
+
+
+def test_registry_fingerprint():
+    def _build_registry(explanation):
+        registry = PatchingRegistry("fingerprintfamily")
+
+        def fix_something(utils):
+            pass
+
+        fix_something.__doc__ = explanation
+        registry.register_compatibility_fixer(fixer_reference_version="1.0")(
+            fix_something
+        )
+        return registry
+
+    fingerprint = _build_registry("Some explanation").get_fingerprint()
+    assert len(fingerprint) == 64
+    assert _build_registry("Some explanation").get_fingerprint() == fingerprint
+    assert _build_registry("Other explanation").get_fingerprint() != fingerprint
+
+    registry = _build_registry("Some explanation")
+    assert registry.get_fingerprint() == fingerprint
+
+    @registry.register_compatibility_fixer(fixer_reference_version="2.0")
+    def fix_other(utils):
+        "Some other fixer"
+
+    assert registry.get_fingerprint() != fingerprint  # Cached fingerprint was reset
+
+    multi_registry = MultiPatchingRegistry([patching_registry, patching_registry_bis])
+    multi_fingerprint = multi_registry.get_fingerprint()
+    assert multi_fingerprint == multi_registry.get_fingerprint()
+    assert multi_fingerprint != patching_registry.get_fingerprint()
+
+
+def test_registry_freeze():
+    import threading
+
+    registry = PatchingRegistry(
+        "frozenfamily",
+        populate_callable=lambda registry: registry.register_compatibility_fixer(
+            fixer_reference_version="2.0", fixer_tags=["mytag"]
+        )(fix_populated),
+        current_software_version="3.0",
+    )
+
+    def fix_populated(utils):
+        "A populated fixer"
+
+    @registry.register_compatibility_fixer(fixer_reference_version="1.0")
+    def fix_first(utils):
+        "A first fixer"
+
+    fingerprint = registry.get_fingerprint()  # Populates the registry
+    fixer_ids = registry.get_relevant_fixer_ids()
+
+    registry.freeze()
+    registry.freeze()  # Idempotent
+    assert registry._is_frozen
+    assert registry.get_fingerprint() == fingerprint
+    assert registry.get_relevant_fixer_ids() == fixer_ids == ["fix_first", "fix_populated"]
+    assert registry.get_fixer_by_id("fix_populated")["fixer_tags"] == ["mytag"]
+    with pytest.raises(TypeError):
+        registry.get_fixer_by_id("fix_populated")["fixer_tags"] = []  # Read-only
+    assert registry.get_relevant_fixer_ids(
+        include_fixer_ids=["frozenfamily2.0|fix_populated", "fix_unknown"],
+        include_fixer_families=["frozenfamily1.0"],
+    ) == ["fix_first", "fix_populated"]  # Uses indexes, in registration order
+    assert registry.get_relevant_fixer_ids(
+        include_fixer_ids=["fix_populated"],
+        include_fixer_families=["frozenfamily1.0"],
+        exclude_fixer_families=["frozenfamily2.0"],
+        current_software_version="1.5",
+    ) == ["fix_first"]
+    selection = registry.get_relevant_fixers()
+    selection.pop()  # Cached selections are copied
+    assert registry.get_relevant_fixer_ids() == fixer_ids
+    assert (
+        registry.get_fixer_by_qualified_name("frozenfamily1.0|fix_first")["fixer_id"]
+        == "fix_first"
+    )
+    with pytest.raises(KeyError):
+        registry.get_fixer_by_qualified_name("frozenfamily2.0|fix_first")
+
+    all_fixers = registry.get_all_fixers()
+    all_fixers.pop()  # Callers get their own list
+    assert len(registry.get_all_fixers()) == 2
+
+    with pytest.raises(RuntimeError, match="frozen registry"):
+        registry.register_compatibility_fixer(fixer_reference_version="1.0")
+    with pytest.raises(TypeError):
+        registry._patching_registry["fix_other"] = {}
+
+    results = []
+
+    def _select_fixers():
+        results.append(registry.get_relevant_fixer_ids(include_fixer_ids=["fix_first"]))
+
+    threads = [threading.Thread(target=_select_fixers) for i in range(10)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert results == [["fix_first"]] * 10
+
+    other_registry = PatchingRegistry("otherfrozenfamily")
+    multi_registry = MultiPatchingRegistry([registry, other_registry])
+    multi_fingerprint = multi_registry.get_fingerprint()
+    multi_registry.freeze()
+    assert other_registry._is_frozen
+    assert multi_registry._frozen_fingerprint == multi_fingerprint
+    assert multi_registry.get_fingerprint() == multi_fingerprint
@@ -1,10 +1,18 @@
+import json
+import os
+
+import pytest
+
+import dummy_fixers
 import dummy_module
 from compat_patcher_core import (
     generic_patch_software,
     PatchingRegistry,
     DEFAULT_SETTINGS,
     make_safe_patcher,
+    set_lock_wait_reporter,
 )
+from compat_patcher_core.locking import GLOBAL_LOCK_KEY, PATCHING_LOCK, get_lock_key
 from compat_patcher_core.registry import MultiPatchingRegistry
 from compat_patcher_core.runner import PatchingRunner
 from compat_patcher_core.utilities import PatchingUtilities, WarningsProxy
@@ -48,6 +56,10 @@ def test_runner_patch_software():
         dummy_module.APPLIED_FIXERS == result["fixers_just_applied"]
     )  # Fixers are really run
 
+    assert patching_utilities.get_injected_objects("dummy5.0|fix_something_always")[
+        0
+    ].target_attrname == "fix_something_always_marker"  # Attributed to the right fixer
+
     result = patching_runner.patch_software()
     assert result == dict(fixers_just_applied=[])  # Already applied so skipped
 
@@ -137,6 +149,125 @@ def test_fixer_idempotence_through_runner():
     )
 
 
+def test_runner_patch_plan_cache(tmp_path, monkeypatch):
+
+    cache_dir = str(tmp_path / "patch_plans")
+    settings = DEFAULT_SETTINGS.copy()
+    multi_registry = MultiPatchingRegistry(
+        registries=[patching_registry, patching_registry_bis]
+    )
+
+    def _run_patching(settings):
+        PatchingRunner._clear_all_applied_fixers()  # Important
+        del dummy_module.APPLIED_FIXERS[:]
+        patching_runner = PatchingRunner(
+            settings=settings,
+            patching_utilities=PatchingUtilities(settings=settings),
+            patching_registry=multi_registry,
+            patch_plan_cache_dir=cache_dir,
+        )
+        return patching_runner.patch_software()
+
+    result = _run_patching(settings)
+    assert len(os.listdir(cache_dir)) == 1
+
+    def _broken_selection(self):
+        raise RuntimeError("Fixers were selected again")
+
+    with monkeypatch.context() as m:
+        m.setattr(PatchingRunner, "_get_sorted_relevant_fixers", _broken_selection)
+        assert _run_patching(settings) == result  # Same order, from cache
+
+        for plan_filename in os.listdir(cache_dir):  # Stale plans are ignored
+            with open(os.path.join(cache_dir, plan_filename), "w") as f:
+                json.dump(dict(fixer_qualified_names=["dummy5.0|unknown_fixer"]), f)
+        with pytest.raises(RuntimeError, match="selected again"):
+            _run_patching(settings)
+
+    settings["exclude_fixer_ids"] = ["fix_something_upto_v6"]
+    result = _run_patching(settings)
+    assert "fix_something_upto_v6" not in result["fixers_just_applied"]
+    assert len(os.listdir(cache_dir)) == 2  # Different settings, different plan
+
+    populated_registries = []
+
+    def _populate(registry):
+        populated_registries.append(registry)
+        registry.register_compatibility_fixer(fixer_reference_version="5.0")(
+            dummy_fixers.fix_something_always
+        )
+
+    for patch_plan_key, populated in (("1.0", True), ("1.0", False), ("1.1", True)):
+        PatchingRunner._clear_all_applied_fixers()
+        del dummy_module.APPLIED_FIXERS[:]
+        registry = PatchingRegistry(
+            "lazydummy", populate_callable=_populate, current_software_version="5.1"
+        )
+        generic_patch_software(
+            settings=DEFAULT_SETTINGS,
+            patching_registry=registry,
+            patch_plan_cache_dir=cache_dir,
+            patch_plan_key=patch_plan_key,
+        )
+        assert dummy_module.APPLIED_FIXERS == ["fix_something_always"]
+        assert (registry in populated_registries) == populated  # Not on cache hits
+
+    def _run_lazy_patching():
+        registry = PatchingRegistry(
+            "lazydummy", populate_callable=_populate, current_software_version="5.1"
+        )
+        generic_patch_software(
+            settings=DEFAULT_SETTINGS,
+            patching_registry=registry,
+            patch_plan_cache_dir=cache_dir,
+            patch_plan_key="1.1",
+        )
+        return registry
+
+    (tmp_path / "broken_fixers_module.py").write_text("raise ValueError('bug')\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for callable_path, populated in (
+        ("dummy_fixers.unexisting_fixer", True),  # Stale plan
+        ("broken_fixers_module.fix_something_always", None),  # Bug in fixers module
+    ):
+        for plan_filename in os.listdir(cache_dir):
+            with open(os.path.join(cache_dir, plan_filename), "w") as f:
+                json.dump(
+                    dict(
+                        fixer_qualified_names=["lazydummy5.0|fix_something_always"],
+                        fixer_callable_paths=[callable_path],
+                    ),
+                    f,
+                )
+        PatchingRunner._clear_all_applied_fixers()
+        if populated is None:
+            with pytest.raises(ValueError, match="bug"):
+                _run_lazy_patching()
+        else:
+            assert _run_lazy_patching() in populated_registries
+
+
+def test_runner_selection_in_frozen_registry():
+    registry = PatchingRegistry("runnerfrozenfamily", current_software_version="2.0")
+
+    @registry.register_compatibility_fixer(fixer_reference_version="1.0")
+    def fix_frozen(utils):
+        "A fixer of a frozen registry"
+
+    registry.freeze()
+
+    for logging_level, indexes_used in (("DEBUG", False), ("INFO", True)):
+        settings = dict(DEFAULT_SETTINGS, logging_level=logging_level)
+        patching_runner = PatchingRunner(
+            settings=settings,
+            patching_utilities=PatchingUtilities(settings=settings),
+            patching_registry=registry,
+        )
+        relevant_fixers = patching_runner._get_sorted_relevant_fixers()
+        assert [f["fixer_id"] for f in relevant_fixers] == ["fix_frozen"]
+        assert bool(registry._frozen_selections) == indexes_used
+
+
 def test_make_safe_patcher():
     import time, threading
 
@@ -160,3 +291,134 @@ def test_make_safe_patcher():
     [t.join() for t in threads]
 
     assert shared_value[0] == 5
+
+
+def test_make_safe_patcher_with_lock_keys():
+    import threading, time
+
+    waits = []
+    set_lock_wait_reporter(lambda lock_key, duration: waits.append(lock_key))
+
+    try:
+        first_started = threading.Event()
+        release_first = threading.Event()
+
+        @make_safe_patcher(lock_keys="first_software")
+        def first_patcher():
+            first_started.set()
+            release_first.wait(5)
+
+        @make_safe_patcher(lock_keys=["second_software"])
+        def second_patcher():
+            return "second"
+
+        @make_safe_patcher(lock_keys=[patching_registry, "first_software"])
+        def outer_patcher():
+            return inner_patcher()
+
+        @make_safe_patcher(lock_keys="first_software")
+        def inner_patcher():
+            return second_patcher()  # Sorts after held locks, so allowed
+
+        thread = threading.Thread(target=first_patcher)
+        thread.start()
+        first_started.wait(5)
+        assert second_patcher() == "second"  # Not blocked by unrelated patcher
+        release_first.set()
+        thread.join()
+
+        with pytest.raises(RuntimeError, match="declare it in the lock keys"):
+            make_safe_patcher(lock_keys="zzz")(inner_patcher)()
+
+        assert outer_patcher() == "second"
+        assert "first_software" in waits and "second_software" in waits
+
+        @make_safe_patcher
+        def default_patcher():
+            time.sleep(0.01)
+            return "default"
+
+        with pytest.raises(RuntimeError, match="declare GLOBAL_LOCK_KEY"):
+            make_safe_patcher(lock_keys="first_software")(default_patcher)()
+
+        running_patchers = []
+        overlaps = []
+
+        @make_safe_patcher(lock_keys=[GLOBAL_LOCK_KEY, "first_software"])
+        def keyed_outer_patcher(name):
+            running_patchers.append(name)
+            overlaps.append(list(running_patchers))
+            try:
+                return default_patcher()
+            finally:
+                running_patchers.remove(name)
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda name=name: results.append(keyed_outer_patcher(name))
+            )
+            for name in "AB"
+        ]
+        with PATCHING_LOCK:  # Global lock is busy while keyed patchers start
+            [t.start() for t in threads]
+            time.sleep(0.05)
+        [t.join(5) for t in threads]
+        assert results == ["default", "default"]
+        assert sorted(overlaps) == [["A"], ["B"]]  # Mutual exclusion was kept
+
+        def _failing_reporter(lock_key, duration):
+            raise ValueError(lock_key)
+
+        set_lock_wait_reporter(_failing_reporter)
+        with pytest.raises(ValueError):
+            second_patcher()
+        set_lock_wait_reporter(None)
+        thread = threading.Thread(target=lambda: results.append(second_patcher()))
+        thread.start()
+        thread.join(5)
+        assert results == ["default", "default", "second"]  # Lock was released
+
+        assert patching_registry._family_prefix + "@" in get_lock_key(
+            patching_registry
+        )
+    finally:
+        set_lock_wait_reporter(None)
+
+
+def test_generic_patch_software_with_tracer(tmp_path):
+    from compat_patcher_core.tracing import ChromeTraceTracer, NULL_TRACER
+
+    with NULL_TRACER.span("noop", some_attribute=1) as span:
+        span.set_attribute("other_attribute", 2)  # Does nothing
+
+    PatchingRunner._clear_all_applied_fixers()  # Important
+    del dummy_module.APPLIED_FIXERS[:]
+
+    tracer = ChromeTraceTracer()
+    generic_patch_software(
+        settings=DEFAULT_SETTINGS.copy(),
+        patching_registry=patching_registry,
+        tracer=tracer,
+    )
+
+    events = {event["name"]: event for event in tracer.get_events()}
+    assert events["selection"]["args"] == dict(
+        fixers_considered=7, fixers_selected=5, fixers_skipped=2
+    )
+    assert events["dummy5.0|fix_something_always"]["args"] == dict(status="applied")
+    assert events["dummy5.0|fix_something_but_skipped"]["args"] == dict(
+        status="skipped"
+    )
+    root_span = events["generic_patch_software"]
+    for name in ("populate", "selection", "sorting", "patch_software"):
+        assert root_span["ts"] <= events[name]["ts"]  # Nested spans
+        assert events[name]["ts"] + events[name]["dur"] <= (
+            root_span["ts"] + root_span["dur"]
+        )
+
+    trace_file = tmp_path / "trace.json"
+    tracer.export(str(trace_file))
+    trace = json.loads(trace_file.read_text())
+    assert len(trace["traceEvents"]) == len(tracer.get_events())
+    assert trace["traceEvents"][0]["ph"] == "X"
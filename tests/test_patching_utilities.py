@@ -183,3 +183,356 @@ def test_version_tuplify_detuplify():
     assert detuplify_software_version((5, 0)) == "5.0"
     assert detuplify_software_version("5.0") == "5.0"
     assert detuplify_software_version(None) is None
+
+
+def test_inject_lazy_attribute():
+    import types
+
+    patching_utilities = PatchingUtilities(example_settings)
+
+    calls = []
+
+    class MyShim(object):
+        pass
+
+    def shim_factory():
+        calls.append("shim")
+        return MyShim()
+
+    my_module = types.ModuleType("my_lazy_module")
+
+    def previous_getattr(name):
+        if name == "dynamic_attr":
+            return 33
+        raise AttributeError(name)
+
+    my_module.__getattr__ = previous_getattr
+
+    patching_utilities.inject_lazy_attribute(my_module, "shim", shim_factory)
+    patching_utilities.inject_lazy_attribute(my_module, "other", lambda: [1, 2])
+    assert not calls  # Nothing built yet
+    assert "shim" not in vars(my_module)
+
+    shim = my_module.shim
+    assert isinstance(shim, MyShim)
+    assert my_module.shim is shim  # Cached on the module
+    assert vars(my_module)["shim"] is shim
+    assert calls == ["shim"]
+    assert getattr(shim, default_patch_marker) == True
+
+    assert my_module.other == [1, 2]
+    assert my_module.dynamic_attr == 33  # Chained onto existing __getattr__
+    with pytest.raises(AttributeError):
+        my_module.unexisting_attr
+
+    class MyClass(object):
+        pass
+
+    def method_factory():
+        calls.append("method")
+
+        def new_method(self):
+            return self
+
+        return new_method
+
+    patching_utilities.inject_lazy_attribute(MyClass, "new_method", method_factory)
+    assert calls == ["shim"]
+
+    my_instance = MyClass()
+    assert my_instance.new_method() is my_instance  # Properly bound on first access
+    assert my_instance.new_method() is my_instance
+    assert calls == ["shim", "method"]
+    assert getattr(MyClass.__dict__["new_method"], default_patch_marker) == True
+
+    def classmethod_factory():
+        return classmethod(lambda cls: cls)
+
+    patching_utilities.inject_lazy_attribute(MyClass, "new_cm", classmethod_factory)
+    assert MyClass.new_cm() is MyClass  # Properly bound on first class-level access
+    assert MyClass.new_cm() is MyClass
+    assert isinstance(MyClass.__dict__["new_cm"], classmethod)
+
+
+def test_inject_many():
+    import functools
+    import types
+
+    patching_utilities = PatchingUtilities(example_settings)
+
+    class MyShim(object):
+        pass
+
+    class MyClass(object):
+        def method(self):
+            return True
+
+    def my_function():
+        return 42
+
+    my_instance = MyClass()
+    my_module = types.ModuleType("my_batch_module")
+    my_module.existing_attr = "old"
+
+    outcome = patching_utilities.inject_many(
+        my_module,
+        dict(
+            my_function=my_function,
+            MyShim=MyShim,
+            length=len,
+            Cls=int,
+            bound=my_instance.method,
+            cached=functools.lru_cache()(my_function),
+        ),
+    )
+    assert outcome == dict(
+        my_function=True, MyShim=True, length=False, Cls=False, bound=False, cached=True
+    )
+    assert my_module.my_function() == 42
+    assert my_module.MyShim is MyShim
+    assert my_module.Cls is int
+
+    with pytest.raises(AssertionError):  # Validation is done before any injection
+        patching_utilities.inject_many(my_module, dict(new_attr=MyShim(), other=None))
+    assert not hasattr(my_module, "new_attr")
+
+    class Frozen(object):
+        __slots__ = ()
+
+    with pytest.raises(AttributeError):
+        patching_utilities.inject_many_into_targets(
+            [
+                (my_module, dict(existing_attr=MyShim(), added_attr=MyShim())),
+                (Frozen(), dict(impossible_attr=MyShim())),
+            ],
+            atomic=True,
+        )
+    assert my_module.existing_attr == "old"  # Rolled back
+    assert not hasattr(my_module, "added_attr")
+
+    outcomes = patching_utilities.inject_many_into_targets(  # Not atomic
+        [
+            (my_module, dict(added_attr=my_function)),
+            (Frozen(), dict(impossible_attr=my_function, other_attr=my_function)),
+            (MyClass, dict(added_attr=my_function)),
+        ]
+    )
+    assert outcomes[0] == dict(added_attr=True)
+    assert isinstance(outcomes[1]["impossible_attr"], AttributeError)
+    assert isinstance(outcomes[1]["other_attr"], AttributeError)
+    assert outcomes[2] == dict(added_attr=True)
+    assert my_module.added_attr is MyClass.added_attr is my_function
+
+    patching_utilities.apply_settings(dict(patch_injected_objects=False))
+    outcomes = patching_utilities.inject_many_into_targets(
+        [(my_module, dict(existing_attr=MyShim())), (MyClass, dict(shim=MyShim()))]
+    )
+    assert outcomes == [dict(existing_attr=None), dict(shim=None)]
+    assert isinstance(MyClass.shim, MyShim)
+
+
+def test_injected_objects_registry():
+    import gc
+    import types
+
+    patching_utilities = PatchingUtilities(example_settings)
+    patching_utilities.apply_settings(dict(patch_injected_objects=False))
+    registry = patching_utilities.injected_objects_registry
+
+    class MyClass(object):
+        def method(self):
+            return True
+
+    my_instance = MyClass()
+    my_module = types.ModuleType("my_registry_module")
+
+    with patching_utilities._applying_fixer("dummy5.0|fix_registry_stuffs"):
+        patching_utilities.inject_attribute(my_module, "bound", my_instance.method)
+        patching_utilities.inject_class(my_module, "MyClass", MyClass)
+        patching_utilities.inject_lazy_attribute(my_module, "lazy", lambda: MyClass())
+    patching_utilities.inject_attribute(my_module, "other", MyClass())
+
+    assert patching_utilities.is_injected_object(my_module.bound)  # Despite no marker
+    assert patching_utilities.is_injected_object(MyClass)
+    assert not patching_utilities.is_injected_object(my_instance)
+
+    lazy = my_module.lazy  # Built outside of fixer, but attributed to it
+    injections = patching_utilities.get_injected_objects("dummy5.0|fix_registry_stuffs")
+    assert [(r.target_object, r.target_attrname) for r in injections] == [
+        (my_module, "bound"),
+        (my_module, "MyClass"),
+        (my_module, "lazy"),
+    ]
+    assert injections[2].injected_object is lazy
+    assert registry.get_injection(my_module, "other").fixer_qualified_name is None
+    assert registry.get_injection(my_module, "unexisting") is None
+
+    other = my_module.other
+    patching_utilities.inject_attribute(my_module, "other", MyClass())  # Replaced
+    assert not patching_utilities.is_injected_object(other)
+
+    del my_module.lazy, lazy, injections
+    gc.collect()
+    injections = patching_utilities.get_injected_objects("dummy5.0|fix_registry_stuffs")
+    assert len(injections) == 2
+    assert registry.get_injection(my_module, "lazy") is None
+
+
+def test_inject_method_and_property_aliases():
+    from compat_patcher_core.utilities import stdlib_warnings
+
+    patching_utilities = PatchingUtilities(example_settings)
+
+    class MyModel(object):
+        _value = 3
+
+        def compute(self, added):
+            return self._value + added
+
+        @classmethod
+        def build(cls):
+            return cls()
+
+        @staticmethod
+        def helper():
+            return "helped"
+
+        @property
+        def value(self):
+            return self._value
+
+        @value.setter
+        def value(self, new_value):
+            self._value = new_value
+
+    class MySubModel(MyModel):
+        def compute(self, added):
+            return 100 + added
+
+    alias = patching_utilities.inject_method_alias(MyModel, "old_compute", "compute")
+    patching_utilities.inject_method_alias(MyModel, "old_build", "build")
+    patching_utilities.inject_method_alias(MyModel, "old_helper", "helper")
+    patching_utilities.inject_property_alias(MyModel, "old_value", "value")
+
+    with pytest.raises(AssertionError):
+        patching_utilities.inject_method_alias(MyModel, "old_thing", "value")
+    with pytest.raises(AssertionError):
+        patching_utilities.inject_property_alias(MyModel, "old_thing", "compute")
+
+    stdlib_warnings.simplefilter("always", Warning)
+
+    my_model = MyModel()
+    with stdlib_warnings.catch_warnings(record=True) as w:
+        assert my_model.old_compute(2) == 5
+        assert isinstance(MyModel.old_build(), MyModel)
+        assert MyModel.old_helper() == "helped"
+        assert my_model.old_helper() == "helped"
+        assert MySubModel().old_compute(2) == 102  # Overrides are respected
+        my_model.old_value = 10
+        assert my_model.old_value == 10
+        assert my_model.value == 10
+    assert len(w) == 7
+    assert "MyModel.old_compute, which is an alias for MyModel.compute" in str(
+        w[0].message
+    )
+    assert "was accessed" in str(w[0].message)
+    assert w[0].filename == __file__
+
+    assert alias.usage_count == 2
+    with stdlib_warnings.catch_warnings(record=True) as w:
+        assert hasattr(my_model, "old_compute")  # Lookups count as accesses
+    assert len(w) == 1
+    assert alias.usage_count == 3
+    assert MyModel.old_value is MyModel.__dict__["old_value"]  # Like properties
+    assert getattr(MyModel.__dict__["old_compute"], default_patch_marker) == True
+
+
+def test_audit_injections(capsys):
+    import types
+
+    patching_utilities = PatchingUtilities(example_settings)
+    patching_utilities.injected_objects_registry.clear()
+
+    class MyClass(object):
+        def method(self):
+            return True
+
+    my_module = types.ModuleType("my_audited_module")
+
+    with patching_utilities._applying_fixer("dummy5.0|fix_audited_stuffs"):
+        patching_utilities.inject_attribute(my_module, "kept", MyClass())
+        patching_utilities.inject_attribute(my_module, "overwritten", MyClass())
+        patching_utilities.inject_class(my_module, "Removed", MyClass)
+        patching_utilities.inject_method_alias(MyClass, "old_method", "method")
+        patching_utilities.inject_module("my_audited_module_alias", my_module)
+
+    report = patching_utilities.audit_injections()
+    assert report == dict(overwritten=[], removed=[], checked_count=5)
+
+    my_module.overwritten = "something else"
+    del my_module.Removed
+    import sys
+
+    del sys.modules["my_audited_module_alias"]
+
+    report = patching_utilities.audit_injections()
+    assert report["checked_count"] == 5
+    assert [r.target_attrname for r in report["overwritten"]] == ["overwritten"]
+    assert report["overwritten"][0].injected_object is None  # Garbage collected
+    assert [r.target_attrname for r in report["removed"]] == [
+        "Removed",
+        "my_audited_module_alias",
+    ]
+    assert report["removed"][0].fixer_qualified_name == "dummy5.0|fix_audited_stuffs"
+
+    out, err = capsys.readouterr()
+    assert "Injected attribute 'overwritten' of" in err
+    assert "was overwritten" in err
+    assert "was removed" in err
+
+
+def test_inject_moved_symbol():
+    patching_utilities = PatchingUtilities(example_settings)
+
+    patching_utilities.inject_moved_symbol(
+        "dummy_module", "MovedDictReader", new_module_name="csv", new_name="DictReader"
+    )
+    from dummy_module import MovedDictReader
+    from csv import DictReader
+
+    assert MovedDictReader is DictReader
+
+
+def test_lightweight_package_imports():
+    import os
+    import subprocess
+    import sys
+
+    import compat_patcher_core
+
+    src_dir = os.path.dirname(os.path.dirname(compat_patcher_core.__file__))
+    script = (
+        "import sys\n"
+        "import compat_patcher_core\n"
+        "assert 'compat_patcher_core.registry' not in sys.modules\n"
+        "from compat_patcher_core.utilities import WarningsProxy\n"
+        "from compat_patcher_core import PatchingRegistry, generic_patch_software\n"
+        "heavy_modules = {'logging', 'importlib', 'json', 'hashlib'}\n"
+        "print(sorted(heavy_modules & set(sys.modules)))\n"
+    )
+    output = subprocess.check_output(
+        [sys.executable, "-c", script],
+        env=dict(os.environ, PYTHONPATH=src_dir),
+        universal_newlines=True,
+    )
+    assert output.strip() == "[]"
+
+    # Submodules and public names remain available as before
+    namespace = {}
+    exec("from compat_patcher_core import *", namespace)
+    assert namespace["PatchingRegistry"] is compat_patcher_core.PatchingRegistry
+    assert "generic_patch_software" in namespace
+    assert compat_patcher_core.utilities.WarningsProxy
+    assert compat_patcher_core.exceptions.SkipFixerException
+    with pytest.raises(AttributeError):
+        compat_patcher_core.unknown_attribute
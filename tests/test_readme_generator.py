@@ -24,3 +24,107 @@ def test_generate_readme(tmp_path):
     assert "THIS IS A README" in html_body
     assert "fixers available" in html_body
     assert "<table" in html_body
+
+
+def test_make_table():
+    from compat_patcher_core.readme_generator import make_table
+
+    table = make_table([["Name", "Version"], ["some long fixer name", "1.0"]])
+    assert table == (
+        "+----------------------+---------+\n"
+        "| Name                 | Version |\n"
+        "+======================+=========+\n"
+        "| some long fixer name | 1.0     |\n"
+        "+----------------------+---------+\n"
+    )  # Each column has its own width
+
+    html_body = publish_parts(source=table, writer_name="html4css1")["html_body"]
+    assert "<td>some long fixer name</td>" in html_body
+
+
+def test_generate_readme_incrementally(tmp_path):
+    from compat_patcher_core import PatchingRegistry
+
+    readme_in_file = tmp_path / "Readme.in"
+    readme_in_file.write_text("THIS IS A README\n####################\n\n")
+    readme_out_file = tmp_path / "Readme.txt"
+
+    registry = PatchingRegistry("mysoftware")
+
+    @registry.register_compatibility_fixer(fixer_reference_version="1.0")
+    def fix_first(utils):
+        "A first fixer"
+
+    args = (str(readme_in_file), str(readme_out_file), registry)
+    assert generate_readme(*args)
+    content = readme_out_file.read_text()
+    assert ".. fixers-table-fingerprint: " in content
+    assert "fix_first" in content
+
+    readme_out_file.write_text(content + "\nMANUAL CHANGE\n")
+    assert not generate_readme(*args)  # Fingerprint unchanged, nothing done
+    assert "MANUAL CHANGE" in readme_out_file.read_text()
+
+    assert generate_readme(*args, force=True)
+    assert readme_out_file.read_text() == content
+    assert not generate_readme(*args, force=True)  # Same bytes, not rewritten
+    assert not [path for path in tmp_path.iterdir() if path.name.endswith(".tmp")]
+
+    @registry.register_compatibility_fixer(fixer_reference_version="2.0")
+    def fix_second(utils):
+        "A second fixer"
+
+    assert generate_readme(*args)
+    assert "fix_second" in readme_out_file.read_text()
+
+    readme_in_file.write_text("ANOTHER README\n####################\n\n")
+    assert generate_readme(*args)
+    assert "ANOTHER README" in readme_out_file.read_text()
+
+
+def test_generate_fixers_catalog(tmp_path):
+    import csv
+    import json
+
+    import pytest
+
+    from compat_patcher_core import MultiPatchingRegistry
+    from compat_patcher_core.readme_generator import (
+        CATALOG_FIELDS,
+        generate_fixers_catalog,
+    )
+    from dummy_fixers import patching_registry_bis
+
+    registry = MultiPatchingRegistry([patching_registry, patching_registry_bis])
+    all_fixers = registry.get_all_fixers()
+
+    jsonl_file = tmp_path / "catalog.jsonl"
+    generate_fixers_catalog(str(jsonl_file), registry)
+    records = [json.loads(line) for line in jsonl_file.read_text().splitlines()]
+    assert [r["fixer_qualified_name"] for r in records] == [
+        f["fixer_qualified_name"] for f in all_fixers
+    ]
+    assert set(records[0]) == set(CATALOG_FIELDS)
+    assert isinstance(records[0]["fixer_tags"], list)
+    assert all(
+        r["fixer_reference_version"].count(".") >= 1 for r in records
+    )  # Detuplified
+
+    csv_file = tmp_path / "catalog.csv"
+    generate_fixers_catalog(str(csv_file), registry)
+    with open(str(csv_file), newline="") as f:
+        rows = list(csv.reader(f))
+    assert tuple(rows[0]) == CATALOG_FIELDS
+    assert len(rows) == len(all_fixers) + 1
+
+    md_file = tmp_path / "catalog.txt"
+    generate_fixers_catalog(str(md_file), registry, format="markdown")
+    lines = md_file.read_text().splitlines()
+    assert lines[0].startswith("| fixer_family |")
+    assert len(lines) == len(all_fixers) + 2
+    assert all(line.count(" | ") == len(CATALOG_FIELDS) - 1 for line in lines[2:])
+
+    with pytest.raises(ValueError, match="Can't deduce"):
+        generate_fixers_catalog(str(tmp_path / "catalog.xml"), registry)
+    with pytest.raises(ValueError, match="Unknown fixers catalog format"):
+        generate_fixers_catalog(str(md_file), registry, format="xml")
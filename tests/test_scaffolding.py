@@ -1,12 +1,17 @@
+import json
 import os
 
 import pytest
 
 import compat_patcher_core
 from compat_patcher_core import PatchingRegistry
+
+pytest_plugins = ["pytester"]
+from compat_patcher_core import scaffolding
 from compat_patcher_core.scaffolding import (
     ensure_no_stdlib_warnings,
     ensure_all_fixers_have_a_test_under_pytest,
+    scan_forbidden_imports,
 )
 
 
@@ -37,6 +42,54 @@ def test_ensure_all_fixers_have_a_test_under_pytest():
         )
 
 
+def test_fixers_test_coverage_plugin(pytester):
+    pytester.makeconftest(
+        """
+from compat_patcher_core import PatchingRegistry
+from compat_patcher_core.scaffolding import FixersTestCoveragePlugin
+
+patching_registry = PatchingRegistry("myfamily")
+
+@patching_registry.register_compatibility_fixer(fixer_reference_version="1.0")
+def fix_tested(utils):
+    "A help string"
+
+@patching_registry.register_compatibility_fixer(fixer_reference_version="1.0")
+def fix_tested_with_params(utils):
+    "A help string"
+
+@patching_registry.register_compatibility_fixer(fixer_reference_version="2.0")
+def fix_untested(utils):
+    "A help string"
+
+def pytest_configure(config):
+    config.pluginmanager.register(
+        FixersTestCoveragePlugin(patching_registry), "fixers_test_coverage"
+    )
+"""
+    )
+    pytester.makepyfile(
+        """
+import pytest
+
+def test_fix_tested():
+    pass
+
+@pytest.mark.parametrize("value", [1, 2])
+def test_fix_tested_with_params(value):
+    pass
+"""
+    )
+    result = pytester.runpytest("-p", "no:cacheprovider")
+    result.assert_outcomes(passed=3, failed=1)
+    result.stdout.fnmatch_lines(
+        [
+            "*No test written for Myfamily2.0 fixer 'fix_untested'*",
+            "*test_myfamily2.0_fixers.py::MISSING_test_fix_untested*",
+        ]
+    )
+
+
 def test_ensure_no_stdlib_warnings_in_package():
     import warnings  # This line will trigger checker error
 
@@ -50,6 +103,75 @@ def test_ensure_no_stdlib_warnings_in_package():
         ensure_no_stdlib_warnings(test_root)
 
 
+def test_scan_forbidden_imports(tmp_path, monkeypatch):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "clean.py").write_text(
+        "# import warnings\nTEXT = '''\nimport warnings\n'''\nimport os\n"
+    )
+    (tmp_path / "sub" / "dirty.py").write_text(
+        "import os, warnings as w\n\ndef f():\n    from warnings import warn\n"
+    )
+    (tmp_path / "sub" / "broken.py").write_text("import warnings\ndef (:\n")
+    cache_path = str(tmp_path / "scan_cache.json")
+
+    result = scan_forbidden_imports(str(tmp_path), cache_path=cache_path)
+    assert len(result["analysed_files"]) == 3
+    assert sorted(result["findings"], key=str) == sorted(
+        [
+            (str(tmp_path / "sub" / "dirty.py"), 1, "import os, warnings as w"),
+            (str(tmp_path / "sub" / "dirty.py"), 4, "from warnings import warn"),
+            (str(tmp_path / "sub" / "broken.py"), None, None),  # Unparsable
+        ],
+        key=str,
+    )
+
+    def _forbidden_scan(*args, **kwargs):
+        raise RuntimeError("Cached file was scanned again")
+
+    with monkeypatch.context() as m:
+        m.setattr(scaffolding, "_scan_python_file", _forbidden_scan)
+        cached_result = scan_forbidden_imports(str(tmp_path), cache_path=cache_path)
+    assert cached_result == result
+
+    (tmp_path / "clean.py").write_text("from warnings import catch_warnings\n")
+    monkeypatch.setattr(scaffolding, "_MIN_FILES_FOR_PROCESS_POOL", 1)
+    result = scan_forbidden_imports(
+        str(tmp_path), cache_path=cache_path, max_workers=2
+    )  # Changed file is scanned again, in a process pool
+    assert (
+        str(tmp_path / "clean.py"),
+        1,
+        "from warnings import catch_warnings",
+    ) in result["findings"]
+
+    valid_cache = dict(
+        version=scaffolding._SCAN_CACHE_FORMAT_VERSION,
+        forbidden_modules=["warnings"],
+    )
+    for malformed_cache in (
+        [],
+        dict(version=scaffolding._SCAN_CACHE_FORMAT_VERSION),
+        dict(valid_cache, files=None),
+        dict(valid_cache, files={str(tmp_path / "clean.py"): 3}),
+    ):
+        with open(cache_path, "w") as stream:
+            json.dump(malformed_cache, stream)
+        assert scan_forbidden_imports(str(tmp_path), cache_path=cache_path) == result
+    assert not [path for path in os.listdir(str(tmp_path)) if ".tmp" in path]
+
+    unwritable_cache_path = str(tmp_path / "missing_dir" / "scan_cache.json")
+    assert (  # Saving errors are ignored
+        scan_forbidden_imports(str(tmp_path), cache_path=unwritable_cache_path)
+        == result
+    )
+
+    with pytest.raises(ValueError, match="wrong phrase.*(dirty|broken).py"):
+        ensure_no_stdlib_warnings(str(tmp_path / "sub"))
+    (tmp_path / "sub" / "dirty.py").unlink()
+    with pytest.raises(ValueError, match="wrong phrase.*broken.py"):
+        ensure_no_stdlib_warnings(str(tmp_path / "sub"))  # Legacy regex fallback
+
+
 def test_no_package_shadowing_in_tox():
     import compat_patcher_core
 